@@ -1,9 +1,27 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI # type: ignore
-from app.routes import users, books, authors, chat
+from app.routes import users, books, authors, genres, analytics, chat
+from app.common.jobs import prepare_activity_partitions, start_jobs
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from app.common.AI.retrieval_client import is_ready as vector_store_ready
+from app.common.database.database import engine
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.metrics import MetricsMiddleware, install_query_hooks, render_metrics
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # activity is logged by most endpoints, so its partitions have to exist before the first request
+    await asyncio.to_thread(prepare_activity_partitions)
+    tasks = start_jobs()
+    yield
+    for task in tasks:
+        task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5500",  
@@ -18,10 +36,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+# added last so it is outermost and times compression too
+app.add_middleware(MetricsMiddleware)
+install_query_hooks(engine)
 
 app.include_router(users.router)
 app.include_router(books.router)
 app.include_router(authors.router)
+app.include_router(genres.router)
+app.include_router(analytics.router)
 app.include_router(chat.router)
 
 @app.get("/")
@@ -31,3 +55,24 @@ def read_root():
 @app.get("/health_check")
 def health_check():
         return {"message": "API is running"}
+
+@app.get("/ready")
+def readiness_check():
+    checks = {}
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = str(e)
+    try:
+        checks["vector_store"] = "ok" if vector_store_ready() else "empty"
+    except Exception as e:
+        checks["vector_store"] = str(e)
+
+    ready = all(result == "ok" for result in checks.values())
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "checks": checks})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
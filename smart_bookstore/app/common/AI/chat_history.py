@@ -0,0 +1,17 @@
+import os
+from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
+from langchain_community.chat_message_histories import SQLChatMessageHistory
+from app.common.database.database import engine
+
+# "memory" keeps sessions in this process only; "sql" stores them in postgres so every worker sees the same history
+CHAT_HISTORY_BACKEND = os.getenv("CHAT_HISTORY_BACKEND", "memory")
+CHAT_HISTORY_TABLE = "chat_message_store"
+
+store = {}
+
+def get_session_history(session_id: str) -> BaseChatMessageHistory:
+    if CHAT_HISTORY_BACKEND == "sql":
+        return SQLChatMessageHistory(session_id=session_id, connection=engine, table_name=CHAT_HISTORY_TABLE)
+    if session_id not in store:
+        store[session_id] = InMemoryChatMessageHistory()
+    return store[session_id]
@@ -1,73 +1,121 @@
 import asyncio
+import os
+from typing import Callable
 from sqlalchemy.orm import Session
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
 import re
 from app.common.database.database import get_db
 from app.schemas.chat import AgentState
 from app.common.database.models import Book, Author
-from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
 from langchain_ollama.llms import OllamaLLM
-from app.utils.prompts import main_template, intent_template
-
-embeddings = HuggingFaceEmbeddings()
-db_chroma = Chroma(persist_directory="./chroma_db", embedding_function=embeddings)
+from app.utils.prompts import main_instructions, main_template, intent_template
+from app.middleware.limiter import recommendation_limiter
+from app.common.AI.retrieval_client import aretrieve
+from app.common.AI.context import compress_context
+from app.common.AI.chat_history import get_session_history
+from app.common.CRUD.ranking_crud import GENRE_SCOPE, AUTHOR_SCOPE, get_top_books, refresh_book_rankings
+from app.common.CRUD.genre_crud import sync_book_genres
+from app.utils.genres import normalize_genre
+
+# start vector retrieval while the intent is still being classified, instead of after it
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+INTENT_MAX_TOKENS = 10
+INTENTS = {"book_recommendation", "top_books_genre", "top_books_author", "add_book", "chat_history_query", "greet", "unknown"}
+UNKNOWN_INTENT_MESSAGE = "Sorry, I cant answer this question."
 
 model = ChatOpenAI(model="gpt-4o-mini", api_key="")
-intent_model = ChatOpenAI(model="gpt-4o-mini", api_key="")
+# the answer is a single intent name, so a few tokens are enough and the call returns as soon as it is produced
+intent_model = ChatOpenAI(model="gpt-4o-mini", api_key="", max_tokens=INTENT_MAX_TOKENS)
 
 model = model.with_config(tags=["final_node"])
 
-main_prompt = ChatPromptTemplate.from_template(main_template)
+main_prompt = ChatPromptTemplate.from_messages([("system", main_instructions), ("human", main_template)])
 intent_prompt = ChatPromptTemplate.from_template(intent_template)
 
 main_chain = main_prompt | model
 intent_chain = intent_prompt | intent_model
 
-store = {}
-
-def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = InMemoryChatMessageHistory()
-    return store[session_id]
-
 def ensure_session_id(state):
     if 'session_id' not in state:
         state['session_id'] = 'default_session'
     return state
 
+async def classify_intent(query: str) -> str:
+    intent_response = await intent_chain.ainvoke(query)
+    words = intent_response.content.strip().lower().split()
+    intent = words[0].strip('"') if words else "unknown"
+    return intent if intent in INTENTS else "unknown"
+
+def release_when_done(retrieval: asyncio.Task, release: Callable[[], None]) -> None:
+    # a search already running on a thread or in a pool process cannot be stopped, so its slot is held until it ends
+    def done(task: asyncio.Task) -> None:
+        release()
+        if not task.cancelled():
+            task.exception()
+    retrieval.add_done_callback(done)
+
+async def prepare_chat(query: str, client_key: str) -> dict:
+    # runs before the response starts, so a recommendation rejection is still a real 429/503 with Retry-After;
+    # when it returns the book_recommendation intent the caller holds a recommendation slot and must release it
+    retrieval = None
+    # speculation only runs on a slot that is free right now, reserved from the global recommendation budget
+    # without counting against the user, so it never makes the user's real recommendations hit the per-user cap
+    if SPECULATIVE_RETRIEVAL and await recommendation_limiter.try_reserve():
+        retrieval = asyncio.create_task(aretrieve(query))
+    try:
+        intent = await classify_intent(query)
+    except BaseException:
+        if retrieval:
+            release_when_done(retrieval, recommendation_limiter.unreserve)
+        raise
+
+    if intent != "book_recommendation":
+        if retrieval:
+            release_when_done(retrieval, recommendation_limiter.unreserve)
+        return {"intent": intent}
+    if not retrieval:
+        await recommendation_limiter.acquire(client_key)
+        return {"intent": intent}
+    # the reserved slot becomes the user's recommendation slot, under the same per-user cap as acquire()
+    try:
+        recommendation_limiter.claim(client_key)
+    except BaseException:
+        release_when_done(retrieval, recommendation_limiter.unreserve)
+        raise
+    try:
+        return {"intent": intent, "context": await asyncio.shield(retrieval)}
+    except BaseException:
+        release_when_done(retrieval, lambda: recommendation_limiter.release(client_key))
+        raise
+
 async def detect_intent(state):
     state = ensure_session_id(state)
-    
-    intent_input = state['messages'][-1].content
-    intent_response = intent_chain.invoke([HumanMessage(content=intent_input)])
-    intent = intent_response.content.strip().lower().split()[0]
+
+    # the /chat route classifies before streaming; the graph only classifies when it is run on its own
+    intent = state.get("intent") or await classify_intent(state['messages'][-1].content)
     print(intent)
+
+    update = {"intent": intent, "session_id": state['session_id'], "messages": state['messages']}
     if intent == "unknown":
-        combined_input = f"The user's intent could not be recognized."
-        final_response = await main_chain.ainvoke([HumanMessage(content=combined_input)])
-        
-        response_message = AIMessage(content=final_response.content)
-        
-        return {
-            "messages": [response_message], "intent": "unknown", "session_id": state['session_id']}
-    
-    return {
-        "intent": intent.strip('"'), "session_id": state['session_id'], "messages": state['messages'] }
+        # the answer is fixed by the prompt instructions anyway, so it skips the model call entirely
+        update["messages"] = state['messages'] + [AIMessage(content=UNKNOWN_INTENT_MESSAGE)]
+    return update
 
 async def book_recommendation(state):
     state = ensure_session_id(state)
     
+    # admission to this path (recommendation_limiter) is decided in prepare_chat, before the response starts
     human_input = state['messages'][-1].content
-    context = retrieve(human_input)
-    combined_input = f"Context: {context}\n\nHuman Message: {human_input}"
+    context = state.get("context")
+    if context is None:
+        context = await aretrieve(human_input)
+    combined_input = f"Context:\n{compress_context(context)}\n\nHuman Message: {human_input}"
 
-    response = await main_chain.ainvoke([HumanMessage(content=combined_input)])
+    response = await main_chain.ainvoke(combined_input)
     
     response_message = response.content
     
@@ -88,7 +136,7 @@ async def top_books_genre(state, db: Session):
         k = int(match.group(1))
         genre = match.group(2).strip()
         print(f"Querying top {k} books in the genre: {genre}")
-        top_books = db.query(Book).filter(Book.genre.ilike(f"%{genre}%")).order_by(Book.average_rating.desc()).limit(k).all()
+        top_books = get_top_books(db, GENRE_SCOPE, normalize_genre(genre), k, columns=(Book,))
         if top_books:
             response_message = f"Here are the top {k} books in the genre '{genre}':\n\n"
             for i, book in enumerate(top_books, 1):
@@ -101,7 +149,7 @@ async def top_books_genre(state, db: Session):
     combined_input = f"Human Message: {message_content}\n\n{response_message}"
     print(f"Combined input for model: {combined_input}")
     
-    response = await main_chain.ainvoke([HumanMessage(content=combined_input)]) # change this later
+    response = await main_chain.ainvoke(combined_input) # change this later
     
     response_message = response.content
 
@@ -124,7 +172,7 @@ async def top_books_author(state, db: Session):
         print(f"Querying top {k} books by the author: {author_name}")
         author = db.query(Author).filter(Author.name.ilike(f"%{author_name}%")).first()
         if author:
-            top_books = db.query(Book).filter(Book.author_id == author.author_id).order_by(Book.average_rating.desc()).limit(k).all()
+            top_books = get_top_books(db, AUTHOR_SCOPE, str(author.author_id), k, columns=(Book,))
             if top_books:
                 response_message = f"Here are the top {k} books by '{author_name}':\n\n"
                 for i, book in enumerate(top_books, 1):
@@ -139,7 +187,7 @@ async def top_books_author(state, db: Session):
     combined_input = f"Human Message: {message_content}\n\n{response_message}"
     print(f"Combined input for model: {combined_input}")
     
-    response = await main_chain.ainvoke([HumanMessage(content=combined_input)])
+    response = await main_chain.ainvoke(combined_input)
     
     response_message = response.content
 
@@ -173,6 +221,8 @@ async def add_book(state, db: Session):
             )
             db.add(new_book)
             db.commit()
+            sync_book_genres(db, [(new_book.book_id, genre)])
+            refresh_book_rankings(db, [genre], [author.author_id])
             response_content = f"Book '{title}' by {author_name} added successfully."
         else:
             response_content = f"Author '{author_name}' does not exist in the database. Please add the author first."
@@ -186,7 +236,7 @@ async def add_book(state, db: Session):
     
     combined_input = f"User requested to add a book:\n\n{message_content}\n\n{response_content}"
 
-    final_response = await main_chain.ainvoke([HumanMessage(content=combined_input)])
+    final_response = await main_chain.ainvoke(combined_input)
     
     response_message = final_response.content
 
@@ -207,7 +257,7 @@ async def chat_history_query(state):
 
     config = {"configurable": {"session_id": state['session_id']}}
 
-    response = await main_chain.ainvoke([HumanMessage(content=combined_input)], config=config)
+    response = await main_chain.ainvoke(combined_input, config=config)
     
     response_message = response.content
     return {"messages": state['messages'] + [AIMessage(content=response_message)], "session_id": state['session_id'], "session_history": state.get('session_history', [])}
@@ -219,7 +269,7 @@ async def greet(state):
     combined_input = f"Human Message: {human_input} + (Only greet the user)" # play around with this later
     config = {"configurable": {"session_id": state['session_id']}}
 
-    response = await main_chain.ainvoke([HumanMessage(content=combined_input)], config=config)
+    response = await main_chain.ainvoke(combined_input, config=config)
     
     response_message = response.content
         
@@ -266,8 +316,3 @@ workflow.add_conditional_edges(
 
 app_graph = workflow.compile()
 
-def retrieve(query):
-    docs = db_chroma.similarity_search(query)
-    retrieved_docs = [doc.page_content for doc in docs]
-    return retrieved_docs
-
@@ -0,0 +1,75 @@
+import re
+from typing import Callable, List, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CONTEXT_TOKEN_BUDGET = 600
+MAX_PASSAGES = 4
+# below this a passage keeps only its header line
+MIN_DESCRIPTION_TOKENS = 30
+TOKENIZER_MODEL = "gpt-4o-mini"
+
+# documents in the vector store are rendered as "The book title is X, its description is D, its genre is G, ..."
+passage_pattern = re.compile(
+    r"^The book title is (?P<title>.+?), its description is (?P<description>.*), its genre is (?P<genre>.*?), "
+    r"its author is (?P<author>.*?), its average rating is (?P<rating>[\d.]+) out of 5, its publish year is (?P<year>\d+)\s*$",
+    re.DOTALL
+)
+sentence_end_pattern = re.compile(r"(?<=[.!?])\s+")
+
+def load_token_counter() -> Callable[[str], int]:
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    # roughly four characters per token for English prose
+    return lambda text: (len(text) + 3) // 4
+
+count_tokens = load_token_counter()
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    if count_tokens(text) <= budget:
+        return text
+    kept = ""
+    for sentence in sentence_end_pattern.split(text):
+        candidate = f"{kept} {sentence}".strip()
+        if count_tokens(candidate) > budget:
+            break
+        kept = candidate
+    if kept:
+        return kept
+    # a first sentence longer than the whole budget is cut at a word boundary instead
+    words = text.split()
+    while words and count_tokens(" ".join(words) + "...") > budget:
+        words = words[:int(len(words) * 0.9)]
+    return " ".join(words) + "..." if words else ""
+
+def render_passage(passage: str, budget: int) -> Optional[str]:
+    # "title | author | genre | rating | year" on one line, then as much of the description as the budget allows
+    match = passage_pattern.match(passage)
+    if not match:
+        return truncate_to_tokens(passage, budget) or None
+    header = f"{match.group('title')} | {match.group('author')} | {match.group('genre')} | {match.group('rating')}/5 | {match.group('year')}"
+    description_budget = budget - count_tokens(header) - 1
+    if description_budget < MIN_DESCRIPTION_TOKENS:
+        return header if description_budget >= 0 else None
+    description = truncate_to_tokens(match.group("description").strip(), description_budget)
+    return f"{header}\n{description}" if description else header
+
+def compress_context(passages: List[str], budget: int = CONTEXT_TOKEN_BUDGET, max_passages: int = MAX_PASSAGES) -> str:
+    # passages arrive ranked by similarity: duplicates are dropped, the best ones kept, and descriptions cut to share the budget
+    unique = list(dict.fromkeys(passage.strip() for passage in passages if passage.strip()))[:max_passages]
+    rendered, remaining = [], budget
+    for index, passage in enumerate(unique):
+        share = remaining // (len(unique) - index)
+        block = render_passage(passage, share)
+        if not block:
+            continue
+        rendered.append(block)
+        remaining -= count_tokens(block)
+    return "\n\n".join(rendered)
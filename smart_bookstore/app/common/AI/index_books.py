@@ -0,0 +1,59 @@
+# Builds the vector store from the books table, tagging every document with its book_id,
+# so the recommender joins search hits to books on the key instead of parsing titles out of the text.
+# Run from smart_bookstore/: python -m app.common.AI.index_books            (chroma, upserted in place)
+#                            python -m app.common.AI.index_books --backend mmap --dtype int8
+import argparse
+from typing import List, Tuple
+from sqlalchemy.orm import Session, joinedload
+from app.common.database.database import SessionLocal
+from app.common.database.models import Book
+from app.common.AI.mmap_index import MMAP_INDEX_DIRECTORY, VECTOR_DTYPES, build_index, embed_documents
+
+# chroma rejects batches above roughly 5k records
+CHROMA_BATCH_SIZE = 1000
+
+def render_document(book: Book) -> str:
+    # the same layout as raw_documents.txt, which context.passage_pattern parses
+    author = book.author.name if book.author else "Unknown"
+    rating = f"{book.average_rating:g}" if book.average_rating is not None else "0"
+    return (
+        f"The book title is {book.title}, its description is {book.description or ''}, its genre is {book.genre or ''}, "
+        f"its author is {author}, its average rating is {rating} out of 5, its publish year is {book.published_year or 0}"
+    )
+
+def load_books(db: Session) -> Tuple[List[int], List[str]]:
+    books = db.query(Book).options(joinedload(Book.author)).order_by(Book.book_id).all()
+    return [book.book_id for book in books], [render_document(book) for book in books]
+
+def index_chroma(book_ids: List[int], documents: List[str]) -> int:
+    from app.common.AI.vector_store import get_chroma
+    chroma = get_chroma()
+    ids = [str(book_id) for book_id in book_ids]
+    for start in range(0, len(ids), CHROMA_BATCH_SIZE):
+        end = start + CHROMA_BATCH_SIZE
+        chroma.add_texts(documents[start:end], metadatas=[{"book_id": book_id} for book_id in book_ids[start:end]], ids=ids[start:end])
+    # documents from removed books, and the untagged ones the store was first built with
+    stale = list(set(chroma.get(include=[])["ids"]) - set(ids))
+    for start in range(0, len(stale), CHROMA_BATCH_SIZE):
+        chroma.delete(ids=stale[start:start + CHROMA_BATCH_SIZE])
+    return len(stale)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the vector store from the books table")
+    parser.add_argument("--backend", choices=("chroma", "mmap"), default="chroma")
+    parser.add_argument("--directory", default=MMAP_INDEX_DIRECTORY)
+    parser.add_argument("--dtype", choices=VECTOR_DTYPES, default="int8")
+    parser.add_argument("--nlist", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        book_ids, documents = load_books(db)
+    finally:
+        db.close()
+    if args.backend == "mmap":
+        build_index(documents, embed_documents(documents), args.directory, args.dtype, args.nlist, book_ids)
+        print(f"Indexed {len(documents)} books into {args.directory}")
+    else:
+        removed = index_chroma(book_ids, documents)
+        print(f"Indexed {len(documents)} books into chroma, removed {removed} stale documents")
@@ -0,0 +1,155 @@
+# Quantized IVF vector index stored as memory-mapped .npy files.
+# The files are mapped read-only, so every worker process shares one copy through the page cache instead of holding its own.
+# Build from smart_bookstore/: python -m app.common.AI.mmap_index --dtype int8
+import argparse
+import json
+import math
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+MMAP_INDEX_DIRECTORY = "./vector_index"
+RAW_DOCUMENTS_PATH = "./raw_documents.txt"
+VECTOR_DTYPES = ("int8", "float16")
+DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 20
+KMEANS_SAMPLE_SIZE = 20_000
+EMBED_BATCH_SIZE = 64
+# row table value for documents that were not built from the books table
+MISSING_BOOK_ID = -1
+
+def load_documents(path: str = RAW_DOCUMENTS_PATH) -> List[str]:
+    # one book per paragraph, the same split the chroma store was built from
+    text = Path(path).read_text(encoding="utf-8")
+    return [document.strip() for document in text.split("\n\n") if document.strip()]
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def l2_relevance(distance):
+    # chroma's default space is squared l2, which langchain scores as 1 - d / sqrt(2); both backends report this scale
+    return 1.0 - distance / math.sqrt(2)
+
+def relevance(cosine: np.ndarray) -> np.ndarray:
+    # over unit vectors the squared l2 distance is 2 - 2 * cosine
+    return l2_relevance(2.0 - 2.0 * cosine)
+
+def train_centroids(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    # spherical k-means: cosine assignment, centroids re-normalized after every step
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE_SIZE), replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for list_id in range(nlist):
+            members = sample[assignments == list_id]
+            # an empty list is reseeded from a random sample so no centroid is wasted
+            centroids[list_id] = members.mean(axis=0) if len(members) else sample[rng.integers(len(sample))]
+        centroids = normalize(centroids)
+    return centroids
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    # symmetric per-vector int8: each row keeps its own scale, so one outlier dimension only costs that row precision
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+def build_index(documents: Sequence[str], vectors: np.ndarray, directory: str = MMAP_INDEX_DIRECTORY,
+                dtype: str = "int8", nlist: Optional[int] = None, book_ids: Optional[Sequence[int]] = None) -> None:
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"dtype must be one of {VECTOR_DTYPES}")
+    vectors = normalize(vectors)
+    nlist = min(nlist or max(1, int(math.sqrt(len(vectors)))), len(vectors))
+    centroids = train_centroids(vectors, nlist)
+    assignments = np.argmax(vectors @ centroids.T, axis=1)
+
+    # rows are stored grouped by list, so probing a list reads one contiguous slice of the mapped file
+    order = np.argsort(assignments, kind="stable")
+    list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))]).astype(np.int64)
+    codes, scales = quantize(vectors[order], dtype)
+
+    encoded = [documents[i].encode("utf-8") for i in order]
+    document_offsets = np.concatenate([[0], np.cumsum([len(document) for document in encoded])]).astype(np.int64)
+
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(path / "vectors.npy", codes)
+    if scales is not None:
+        np.save(path / "scales.npy", scales)
+    np.save(path / "centroids.npy", centroids)
+    np.save(path / "list_offsets.npy", list_offsets)
+    np.save(path / "document_offsets.npy", document_offsets)
+    if book_ids is not None:
+        np.save(path / "book_ids.npy", np.asarray(book_ids, dtype=np.int64)[order])
+    elif (path / "book_ids.npy").exists():
+        (path / "book_ids.npy").unlink()
+    (path / "documents.bin").write_bytes(b"".join(encoded))
+    (path / "meta.json").write_text(json.dumps({"dtype": dtype, "count": len(vectors), "nlist": nlist, "dim": vectors.shape[1]}))
+
+class MmapIndex:
+    def __init__(self, directory: str = MMAP_INDEX_DIRECTORY, nprobe: int = DEFAULT_NPROBE):
+        path = Path(directory)
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.nprobe = nprobe
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self.scales = np.load(path / "scales.npy", mmap_mode="r") if self.meta["dtype"] == "int8" else None
+        self.centroids = np.load(path / "centroids.npy")
+        self.list_offsets = np.load(path / "list_offsets.npy")
+        self.document_offsets = np.load(path / "document_offsets.npy", mmap_mode="r")
+        self.documents = np.memmap(path / "documents.bin", dtype=np.uint8, mode="r")
+        self.book_ids = np.load(path / "book_ids.npy", mmap_mode="r") if (path / "book_ids.npy").exists() else None
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def document(self, row: int) -> str:
+        start, end = self.document_offsets[row], self.document_offsets[row + 1]
+        return self.documents[start:end].tobytes().decode("utf-8")
+
+    def book_id(self, row: int) -> Optional[int]:
+        if self.book_ids is None or self.book_ids[row] == MISSING_BOOK_ID:
+            return None
+        return int(self.book_ids[row])
+
+    def candidate_rows(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nprobe = min(nprobe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([np.arange(self.list_offsets[i], self.list_offsets[i + 1]) for i in lists])
+
+    def search_rows(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        rows = self.candidate_rows(query, nprobe or self.nprobe)
+        if not len(rows):
+            return []
+        cosine = self.vectors[rows].astype(np.float32) @ query
+        if self.scales is not None:
+            cosine *= self.scales[rows]
+        top = np.argpartition(-cosine, min(k, len(rows)) - 1)[:k]
+        top = top[np.argsort(-cosine[top])]
+        return [(int(rows[i]), float(cosine[i])) for i in top]
+
+    def search(self, vectors: Sequence[Sequence[float]], k: int = 4,
+               nprobe: Optional[int] = None) -> List[List[Tuple[str, float, Optional[int]]]]:
+        return [
+            [(self.document(row), float(relevance(cosine)), self.book_id(row)) for row, cosine in self.search_rows(query, k, nprobe)]
+            for query in normalize(vectors)
+        ]
+
+def embed_documents(documents: List[str]) -> np.ndarray:
+    from app.common.AI.vector_store import embeddings
+    batches = [embeddings.embed_documents(documents[i:i + EMBED_BATCH_SIZE]) for i in range(0, len(documents), EMBED_BATCH_SIZE)]
+    return np.asarray([vector for batch in batches for vector in batch], dtype=np.float32)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped vector index from raw_documents.txt")
+    parser.add_argument("--documents", default=RAW_DOCUMENTS_PATH)
+    parser.add_argument("--directory", default=MMAP_INDEX_DIRECTORY)
+    parser.add_argument("--dtype", choices=VECTOR_DTYPES, default="int8")
+    parser.add_argument("--nlist", type=int, default=None)
+    args = parser.parse_args()
+
+    documents = load_documents(args.documents)
+    build_index(documents, embed_documents(documents), args.directory, args.dtype, args.nlist)
+    print(f"Indexed {len(documents)} documents into {args.directory}")
@@ -0,0 +1,118 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from sqlalchemy import delete, insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.common.database.database import get_db
+from app.common.database.models import Book, BookGenre, UserFeed, UserLikedBook, UserPreference, UserRecommendation
+from app.common.CRUD.genre_crud import get_genre_ids
+from app.common.AI.retrieval_client import search_batch
+
+FEED_SIZE = 200
+# preference types that feed into scoring; changing any other type leaves the feed untouched
+FEED_PREFERENCE_TYPES = {"genre"}
+GENRE_CANDIDATES = 300
+LIKED_SEEDS = 10
+NEIGHBOURS_PER_LIKE = 10
+
+GENRE_WEIGHT = 1.0
+SIMILARITY_WEIGHT = 1.5
+RATING_WEIGHT = 0.5
+
+def similar_book_ids(liked_books: List[Book]) -> Dict[int, float]:
+    similarities, untagged = {}, 0
+    queries = [f"{book.title}. {book.description or ''}" for book in liked_books]
+    for results in search_batch(queries, k=NEIGHBOURS_PER_LIKE):
+        for _, score, book_id in results:
+            if book_id is None:
+                untagged += 1
+                continue
+            similarities[book_id] = max(score, similarities.get(book_id, 0.0))
+    if untagged and not similarities:
+        logging.warning("Vector store documents carry no book_id; rebuild it with python -m app.common.AI.index_books")
+    return similarities
+
+def score_books(db: Session, username: str) -> List[Tuple[int, float]]:
+    preferred_genres = db.query(UserPreference.preference_value).filter(
+        UserPreference.username == username, UserPreference.preference_type == "genre"
+    )
+    preferred_genre_ids = set(get_genre_ids(db, (value for (value,) in preferred_genres)).values())
+    liked_ids = {book_id for (book_id,) in db.query(UserLikedBook.book_id).filter(UserLikedBook.username == username)}
+    liked_books = (
+        db.query(Book)
+        .join(UserLikedBook, UserLikedBook.book_id == Book.book_id)
+        .filter(UserLikedBook.username == username)
+        .order_by(UserLikedBook.id.desc())
+        .limit(LIKED_SEEDS)
+        .all()
+    )
+
+    candidates, genre_matches = {}, set()
+    if preferred_genre_ids:
+        rows = (
+            db.query(Book.book_id, Book.title, Book.average_rating)
+            .join(BookGenre, BookGenre.book_id == Book.book_id)
+            .filter(BookGenre.genre_id.in_(preferred_genre_ids))
+            .distinct()
+            .order_by(Book.average_rating.desc().nullslast(), Book.book_id)
+            .limit(GENRE_CANDIDATES)
+        )
+        candidates.update({row.book_id: row for row in rows})
+        genre_matches.update(candidates)
+
+    similarities = similar_book_ids(liked_books)
+    if similarities:
+        rows = db.query(Book.book_id, Book.title, Book.average_rating).filter(Book.book_id.in_(similarities))
+        similar = {row.book_id: row for row in rows}
+        candidates.update(similar)
+        if preferred_genre_ids and similar:
+            genre_matches.update(
+                book_id for (book_id,) in db.query(BookGenre.book_id).filter(
+                    BookGenre.book_id.in_(similar), BookGenre.genre_id.in_(preferred_genre_ids)
+                )
+            )
+
+    scored = []
+    for book_id, row in candidates.items():
+        if book_id in liked_ids:
+            continue
+        score = (
+            GENRE_WEIGHT * (book_id in genre_matches)
+            + SIMILARITY_WEIGHT * similarities.get(book_id, 0.0)
+            + RATING_WEIGHT * (row.average_rating or 0.0) / 5
+        )
+        scored.append((book_id, score))
+
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:FEED_SIZE]
+
+def refresh_user_feed(db: Session, username: str) -> int:
+    # the feed is rebuilt whole rather than patched: it is at most FEED_SIZE rows scored from LIKED_SEEDS searches.
+    # overlapping rebuilds (like/unlike tasks, the first GET) would collide on (username, rank), so they queue per user;
+    # taken before scoring, so the last rebuild to write is also the one that saw the latest likes
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": f"feed:{username}"})
+    scored = score_books(db, username)
+    generated_at = datetime.now(timezone.utc)
+
+    db.execute(delete(UserRecommendation).where(UserRecommendation.username == username))
+    if scored:
+        db.execute(
+            insert(UserRecommendation),
+            [
+                {"username": username, "rank": rank, "book_id": book_id, "score": score, "generated_at": generated_at}
+                for rank, (book_id, score) in enumerate(scored, 1)
+            ]
+        )
+    db.execute(
+        pg_insert(UserFeed)
+        .values(username=username, size=len(scored), generated_at=generated_at)
+        .on_conflict_do_update(index_elements=["username"], set_={"size": len(scored), "generated_at": generated_at})
+    )
+    db.commit()
+    return len(scored)
+
+def refresh_user_feed_task(username: str) -> None:
+    # runs as a background task, after the request's session has been closed
+    with next(get_db()) as db:
+        refresh_user_feed(db, username)
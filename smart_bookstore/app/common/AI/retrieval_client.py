@@ -0,0 +1,88 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import httpx
+
+RETRIEVAL_SERVICE_URL = os.getenv("RETRIEVAL_SERVICE_URL")
+# inprocess: embed in this process on a worker thread (the default, and what tests use)
+# pool: a local pool of spawned processes, each with its own copy of the model
+# http: the separate service in retrieval_service.py
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "http" if RETRIEVAL_SERVICE_URL else "inprocess")
+RETRIEVAL_POOL_SIZE = int(os.getenv("RETRIEVAL_POOL_SIZE", "2"))
+RETRIEVAL_TIMEOUT = 10.0
+DEFAULT_K = 4
+
+if RETRIEVAL_MODE not in ("inprocess", "pool", "http"):
+    raise ValueError(f"Unknown RETRIEVAL_MODE {RETRIEVAL_MODE!r}")
+if RETRIEVAL_MODE == "http" and not RETRIEVAL_SERVICE_URL:
+    raise ValueError("RETRIEVAL_MODE=http needs RETRIEVAL_SERVICE_URL")
+
+if RETRIEVAL_MODE == "inprocess":
+    # imported here rather than lazily so a preloading server still shares the model across workers;
+    # the other modes never load it into the API process
+    from app.common.AI import vector_store
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+
+def run_search_batch(queries: List[str], k: int) -> List[List[Tuple[str, float, Optional[int]]]]:
+    # runs inside the pool processes
+    from app.common.AI import vector_store
+    return vector_store.search_batch(queries, k)
+
+def process_pool() -> ProcessPoolExecutor:
+    # spawned rather than forked: torch and chroma threads do not survive a fork
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ProcessPoolExecutor(max_workers=RETRIEVAL_POOL_SIZE, mp_context=multiprocessing.get_context("spawn"))
+        _pool_pid = os.getpid()
+    return _pool
+
+def http_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        _client = httpx.Client(base_url=RETRIEVAL_SERVICE_URL, timeout=RETRIEVAL_TIMEOUT)
+    return _client
+
+def async_http_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(base_url=RETRIEVAL_SERVICE_URL, timeout=RETRIEVAL_TIMEOUT)
+    return _async_client
+
+def parse_results(response: httpx.Response) -> List[List[Tuple[str, float, Optional[int]]]]:
+    response.raise_for_status()
+    return [[(content, score, book_id) for content, score, book_id in results] for results in response.json()["results"]]
+
+def search_batch(queries: List[str], k: int = DEFAULT_K) -> List[List[Tuple[str, float, Optional[int]]]]:
+    if not queries:
+        return []
+    if RETRIEVAL_MODE == "http":
+        return parse_results(http_client().post("/search", json={"queries": queries, "k": k}))
+    if RETRIEVAL_MODE == "pool":
+        return process_pool().submit(run_search_batch, queries, k).result()
+    return vector_store.search_batch(queries, k)
+
+async def asearch_batch(queries: List[str], k: int = DEFAULT_K) -> List[List[Tuple[str, float, Optional[int]]]]:
+    if not queries:
+        return []
+    if RETRIEVAL_MODE == "http":
+        return parse_results(await async_http_client().post("/search", json={"queries": queries, "k": k}))
+    if RETRIEVAL_MODE == "pool":
+        return await asyncio.wrap_future(process_pool().submit(run_search_batch, queries, k))
+    return await asyncio.to_thread(vector_store.search_batch, queries, k)
+
+async def aretrieve(query: str) -> List[str]:
+    results = await asearch_batch([query])
+    return [content for content, _, _ in results[0]]
+
+def is_ready() -> bool:
+    if RETRIEVAL_MODE == "http":
+        return http_client().get("/ready").status_code == 200
+    if RETRIEVAL_MODE == "pool":
+        return bool(search_batch(["ready"], 1)[0])
+    return vector_store.is_ready()
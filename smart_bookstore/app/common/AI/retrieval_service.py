@@ -0,0 +1,34 @@
+# Standalone embedding/retrieval worker, so embedding does not compete with request handling in the API processes.
+# Run from smart_bookstore/: poetry run uvicorn app.common.AI.retrieval_service:service --port 8001
+# and start the API with RETRIEVAL_SERVICE_URL=http://localhost:8001
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
+from app.common.AI.vector_store import embeddings, is_ready, search_batch
+from app.schemas.retrieval import EmbedRequestSchema, EmbedResponseSchema, SearchRequestSchema, SearchResponseSchema
+
+MAX_BATCH_SIZE = 64
+MAX_K = 50
+
+service = FastAPI(title="Smart Bookstore retrieval", default_response_class=ORJSONResponse)
+
+def check_batch(items: list) -> None:
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} items per batch")
+
+@service.post("/embed", response_model=EmbedResponseSchema)
+def embed(request: EmbedRequestSchema):
+    check_batch(request.texts)
+    return {"vectors": embeddings.embed_documents(request.texts)}
+
+@service.post("/search", response_model=SearchResponseSchema)
+def search(request: SearchRequestSchema):
+    check_batch(request.queries)
+    if not 1 <= request.k <= MAX_K:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_K}")
+    return {"results": search_batch(request.queries, request.k)}
+
+@service.get("/ready")
+def ready():
+    if not is_ready():
+        raise HTTPException(status_code=503, detail="Vector store is empty")
+    return {"ready": True}
@@ -0,0 +1,49 @@
+import os
+from typing import List, Optional, Tuple
+from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_chroma import Chroma
+from app.common.AI.mmap_index import MmapIndex, l2_relevance
+
+CHROMA_DIRECTORY = "./chroma_db"
+# chroma, or mmap for the quantized memory-mapped index in mmap_index.py (build it first)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+MMAP_NPROBE = int(os.getenv("MMAP_NPROBE", "8"))
+
+# loaded at import so a preloading server (see gunicorn.conf.py) shares the model weights copy-on-write across workers
+embeddings = HuggingFaceEmbeddings()
+
+_chroma: Optional[Chroma] = None
+_chroma_pid: Optional[int] = None
+_mmap_index: Optional[MmapIndex] = None
+
+def get_chroma() -> Chroma:
+    # the chroma client holds sqlite handles and threads that must not cross a fork, so each process opens its own
+    global _chroma, _chroma_pid
+    if _chroma is None or _chroma_pid != os.getpid():
+        _chroma = Chroma(persist_directory=CHROMA_DIRECTORY, embedding_function=embeddings)
+        _chroma_pid = os.getpid()
+    return _chroma
+
+def get_mmap_index() -> MmapIndex:
+    # the mapping is read-only, so unlike chroma it is fine to inherit across a fork
+    global _mmap_index
+    if _mmap_index is None:
+        _mmap_index = MmapIndex(nprobe=MMAP_NPROBE)
+    return _mmap_index
+
+def search_batch(queries: List[str], k: int = 4) -> List[List[Tuple[str, float, Optional[int]]]]:
+    # one forward pass embeds every query; callers go through retrieval_client, which picks the process this runs in.
+    # each hit is (document, relevance, book_id), book_id being None for documents not built by index_books.py
+    if VECTOR_BACKEND == "mmap":
+        return get_mmap_index().search(embeddings.embed_documents(queries), k)
+    chroma = get_chroma()
+    results = []
+    for vector in embeddings.embed_documents(queries):
+        docs = chroma.similarity_search_by_vector_with_relevance_scores(vector, k=k)
+        results.append([(doc.page_content, l2_relevance(distance), doc.metadata.get("book_id")) for doc, distance in docs])
+    return results
+
+def is_ready() -> bool:
+    if VECTOR_BACKEND == "mmap":
+        return len(get_mmap_index()) > 0
+    return bool(get_chroma().get(limit=1)["ids"])
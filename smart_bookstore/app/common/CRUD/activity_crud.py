@@ -0,0 +1,154 @@
+import re
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+from sqlalchemy import Integer, cast, delete, func, insert, literal, or_, select, text
+from sqlalchemy.orm import Session
+from app.common.database.models import ActivityType, Book, BookSearchDaily, UserActivity, UserActivityDaily
+
+ACTIVITY_RETENTION_DAYS = 90
+PARTITION_MONTHS_AHEAD = 2
+# catches rows for months that have no partition yet (a fresh database, or maintenance that stopped running)
+DEFAULT_PARTITION = "user_activities_default"
+# rows written before event types existed only carry the free-text description
+LEGACY_BOOK_VIEW_PATTERN = r"^Searched for book with id: (\d+)$"
+
+partition_name_pattern = re.compile(r"^user_activities_(\d{4})_(\d{2})$")
+
+def add_months(month: date, months: int) -> date:
+    year, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + year, month_index + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"user_activities_{month:%Y_%m}"
+
+def ensure_activity_partitions(db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD, months_back: int = 0) -> None:
+    # every worker runs this at startup; concurrent DDL on the same partitioned table would collide in the catalog
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext('user_activities.partitions'))"))
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF user_activities DEFAULT"))
+    existing = set(get_activity_partitions(db))
+    current_month = date.today().replace(day=1)
+    for offset in range(-months_back, months_ahead + 1):
+        start = add_months(current_month, offset)
+        if start in existing:
+            continue
+        end = add_months(start, 1)
+        name = partition_name(start)
+        in_month = f"\"timestamp\" >= '{start.isoformat()}' AND \"timestamp\" < '{end.isoformat()}'"
+        # rows of this month may already sit in the default partition, and a new partition cannot be attached over them
+        db.execute(text(f"CREATE TABLE {name} (LIKE user_activities INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        db.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}"))
+        db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"))
+        db.execute(text(
+            f"ALTER TABLE user_activities ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+    db.commit()
+
+def get_activity_partitions(db: Session) -> List[date]:
+    names = db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'user_activities'"
+    )).scalars()
+    months = []
+    for name in names:
+        match = partition_name_pattern.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+def rollup_activity_day(db: Session, day: date) -> None:
+    # replaces the day's aggregates, so re-running a day is safe
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    in_day = (UserActivity.timestamp >= start, UserActivity.timestamp < end)
+
+    db.execute(delete(UserActivityDaily).where(UserActivityDaily.day == day))
+    db.execute(insert(UserActivityDaily).from_select(
+        ["day", "username", "activity_count"],
+        select(literal(day), UserActivity.username, func.count())
+        .where(*in_day, UserActivity.username.isnot(None))
+        .group_by(UserActivity.username)
+    ))
+
+    searched_book_id = func.coalesce(
+        UserActivity.target_id,
+        cast(func.substring(UserActivity.activity, LEGACY_BOOK_VIEW_PATTERN), Integer)
+    )
+    db.execute(delete(BookSearchDaily).where(BookSearchDaily.day == day))
+    db.execute(insert(BookSearchDaily).from_select(
+        ["day", "book_id", "search_count"],
+        select(literal(day), searched_book_id, func.count())
+        .where(*in_day, or_(
+            UserActivity.event_type == ActivityType.BOOK_VIEW,
+            UserActivity.activity.regexp_match(LEGACY_BOOK_VIEW_PATTERN)
+        ))
+        .group_by(searched_book_id)
+    ))
+    db.commit()
+
+def rollup_pending_days(db: Session) -> None:
+    # resumes from the last rolled day (re-rolling it in case late rows landed), or from the first activity ever
+    yesterday = date.today() - timedelta(days=1)
+    day = db.query(func.max(UserActivityDaily.day)).scalar()
+    if day is None:
+        first_activity = db.query(func.min(UserActivity.timestamp)).scalar()
+        day = first_activity.date() if first_activity else yesterday
+    while day <= yesterday:
+        rollup_activity_day(db, day)
+        day += timedelta(days=1)
+
+def apply_activity_retention(db: Session, retention_days: int = ACTIVITY_RETENTION_DAYS) -> List[str]:
+    cutoff = date.today() - timedelta(days=retention_days)
+    last_rolled = db.query(func.max(UserActivityDaily.day)).scalar()
+    dropped = []
+    for month in get_activity_partitions(db):
+        end = add_months(month, 1)
+        # whole partitions are dropped, and only once every day in them is covered by the rollups
+        if end <= cutoff and last_rolled is not None and last_rolled >= end - timedelta(days=1):
+            db.execute(text(f"DROP TABLE IF EXISTS {partition_name(month)}"))
+            dropped.append(partition_name(month))
+    db.commit()
+    return dropped
+
+def get_activities(db: Session, page: int, page_size: int, username: Optional[str] = None, since: Optional[datetime] = None) -> List[UserActivity]:
+    offset = (page - 1) * page_size
+    query = db.query(UserActivity)
+    if username:
+        query = query.filter(UserActivity.username == username)
+    if since:
+        # a lower bound on timestamp lets postgres prune whole partitions
+        query = query.filter(UserActivity.timestamp >= since)
+    return query.order_by(UserActivity.timestamp.desc()).limit(page_size).offset(offset).all()
+
+def get_top_searched_books(db: Session, days: int, limit: int) -> list:
+    since = date.today() - timedelta(days=days)
+    total = func.sum(BookSearchDaily.search_count).label("search_count")
+    return (
+        db.query(BookSearchDaily.book_id, Book.title, total)
+        .outerjoin(Book, Book.book_id == BookSearchDaily.book_id)
+        .filter(BookSearchDaily.day >= since)
+        .group_by(BookSearchDaily.book_id, Book.title)
+        .order_by(total.desc())
+        .limit(limit)
+        .all()
+    )
+
+def get_daily_active_users(db: Session, days: int) -> list:
+    since = date.today() - timedelta(days=days)
+    return (
+        db.query(UserActivityDaily.day, func.count(UserActivityDaily.username).label("active_users"))
+        .filter(UserActivityDaily.day >= since)
+        .group_by(UserActivityDaily.day)
+        .order_by(UserActivityDaily.day)
+        .all()
+    )
+
+def count_events(db: Session, event_type: ActivityType, target_id: int, since: datetime) -> int:
+    # answered from the (event_type, target_id, timestamp) index, pruned to the partitions after since
+    return db.query(func.count()).select_from(UserActivity).filter(
+        UserActivity.event_type == event_type,
+        UserActivity.target_id == target_id,
+        UserActivity.timestamp >= since
+    ).scalar()
@@ -1,12 +1,15 @@
+from typing import List, Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
-from app.common.database.models import Author
+from app.common.database.models import Author, AUTHOR_COLUMNS
 from app.schemas.author import AuthorSchema
+from app.common.CRUD.ranking_crud import refresh_book_rankings
 
-def get_authors(db: Session, page: int, page_size: int, name: str = None):
+def get_authors(db: Session, page: int, page_size: int, name: str = None, columns: tuple = AUTHOR_COLUMNS):
     offset = (page - 1) * page_size
-    query = db.query(Author)
+    query = db.query(*columns)
     if name:
         query = query.filter(Author.name.ilike(f'%{name}%'))
     return query.limit(page_size).offset(offset).all()
@@ -29,6 +32,26 @@ def create_author(db: Session, author: AuthorSchema) -> Author:
         raise HTTPException(status_code=409, detail="Author already exists")
     return db_author
 
+def create_authors_bulk(db: Session, authors: List[Tuple[int, AuthorSchema]]) -> Tuple[int, List[dict]]:
+    errors = []
+    try:
+        db.execute(insert(Author), [author.model_dump() for _, author in authors])
+        db.commit()
+        return len(authors), errors
+    except IntegrityError:
+        db.rollback()
+
+    inserted = 0
+    for index, author in authors:
+        try:
+            with db.begin_nested():
+                db.execute(insert(Author).values(**author.model_dump()))
+            inserted += 1
+        except IntegrityError:
+            errors.append({"index": index, "detail": "Author already exists"})
+    db.commit()
+    return inserted, errors
+
 def update_author(db: Session, author_id: int, author: AuthorSchema) -> Author:
     db_author = db.query(Author).filter(Author.author_id == author_id).first()
     if not db_author:
@@ -50,5 +73,7 @@ def delete_author(db: Session, author_id: int) -> None:
     if not db_author:
         raise HTTPException(status_code=404, detail="Author not found")
     
+    genres = [book.genre for book in db_author.books]
     db.delete(db_author)
     db.commit()
+    refresh_book_rankings(db, genres, [author_id])
@@ -1,13 +1,30 @@
 from fastapi import HTTPException
+from sqlalchemy import func, insert, select, tuple_, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List
-from app.common.database.models import Book, Author, UserLikedBook, UserPreference
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.common.database.models import Book, Author, UserFeed, UserLikedBook, UserPreference, UserRecommendation, BOOK_COLUMNS
 from app.schemas.book import ModBookSchema, BookSchema
+from app.common.CRUD.ranking_crud import refresh_book_rankings
+from app.common.CRUD.genre_crud import sync_book_genres
 
-def get_books(db: Session, page: int, page_size: int) -> List[Book]:
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ("book_id", "title", "author_id", "author_name", "genre", "description", "average_rating", "published_year", "cover")
+
+def select_book_columns(fields: Optional[str]) -> tuple:
+    if not fields:
+        return BOOK_COLUMNS
+    columns_by_name = {column.key: column for column in BOOK_COLUMNS}
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in columns_by_name]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Valid fields: {', '.join(columns_by_name)}")
+    # book_id is always returned so clients can key the rows
+    return tuple(columns_by_name[name] for name in dict.fromkeys(["book_id", *requested]))
+
+def get_books(db: Session, page: int, page_size: int, columns: tuple = BOOK_COLUMNS) -> list:
     offset = (page - 1) * page_size
-    return db.query(Book).limit(page_size).offset(offset).all()
+    return db.query(*columns).limit(page_size).offset(offset).all()
 
 def get_book_by_id(db: Session, book_id: int) -> Book:
     return db.query(Book).filter(Book.book_id == book_id).first()
@@ -34,8 +51,43 @@ def create_book(db: Session, book: ModBookSchema) -> Book:
         db.rollback()
         raise HTTPException(status_code=409, detail="Book already exists")
 
+    sync_book_genres(db, [(db_book.book_id, db_book.genre)])
+    refresh_book_rankings(db, [db_book.genre], [db_book.author_id])
     return db_book
 
+def create_books_bulk(db: Session, books: List[Tuple[int, ModBookSchema]]) -> Tuple[list, List[dict]]:
+    errors = []
+    author_ids = {book.author_id for _, book in books}
+    known_authors = {author_id for (author_id,) in db.query(Author.author_id).filter(Author.author_id.in_(author_ids))}
+
+    valid_books = []
+    for index, book in books:
+        if book.author_id in known_authors:
+            valid_books.append((index, book))
+        else:
+            errors.append({"index": index, "detail": "Author not found"})
+    if not valid_books:
+        return [], errors
+
+    returning = (Book.book_id, Book.genre, Book.author_id)
+    try:
+        inserted = db.execute(insert(Book).returning(*returning), [book.model_dump() for _, book in valid_books]).all()
+        db.commit()
+    except IntegrityError:
+        # fall back to row-by-row inserts so only the conflicting rows are reported
+        db.rollback()
+        inserted = []
+        for index, book in valid_books:
+            try:
+                with db.begin_nested():
+                    inserted.append(db.execute(insert(Book).values(**book.model_dump()).returning(*returning)).one())
+            except IntegrityError:
+                errors.append({"index": index, "detail": "Book already exists"})
+        db.commit()
+
+    sync_book_genres(db, [(row.book_id, row.genre) for row in inserted])
+    return inserted, errors
+
 def update_book(db: Session, book_id: int, book: BookSchema) -> Book:
     db_book = db.query(Book).filter(Book.book_id == book_id).first()
     if not db_book:
@@ -45,6 +97,7 @@ def update_book(db: Session, book_id: int, book: BookSchema) -> Book:
     if not db_author:
         raise HTTPException(status_code=404, detail="Author not found")
 
+    old_genre, old_author_id = db_book.genre, db_book.author_id
     db_book.title = book.title
     db_book.author_id = book.author_id
     db_book.genre = book.genre
@@ -60,6 +113,9 @@ def update_book(db: Session, book_id: int, book: BookSchema) -> Book:
         db.rollback()
         raise HTTPException(status_code=409, detail="Book with this data already exists")
 
+    if db_book.genre != old_genre:
+        sync_book_genres(db, [(db_book.book_id, db_book.genre)])
+    refresh_book_rankings(db, [old_genre, db_book.genre], [old_author_id, db_book.author_id])
     return db_book
 
 def delete_book(db: Session, book_id: int) -> dict:
@@ -67,32 +123,44 @@ def delete_book(db: Session, book_id: int) -> dict:
     if not db_book:
         raise HTTPException(status_code=404, detail="Book not found")
     
+    genre, author_id = db_book.genre, db_book.author_id
     db.delete(db_book)
     db.commit()
+    refresh_book_rankings(db, [genre], [author_id])
     return {"message": "Book deleted successfully"}
 
-def get_recommended_books(db: Session, username: str, page: int = 1, page_size: int = 10) -> List[Book]:
-    user_preferences = db.query(UserPreference).filter(UserPreference.username == username).all()
-    preferred_genres = [pref.preference_value for pref in user_preferences if pref.preference_type == "genre"]
-    
-    if not preferred_genres:
-        raise HTTPException(status_code=404, detail="No preferred genres found for user, please go to the profile page to select favorite genres!")
-
+def get_feed_page(db: Session, username: str, page: int, page_size: int, columns: tuple = BOOK_COLUMNS) -> list:
+    # ranks are dense, so a page is a range scan on the (username, rank) primary key
     offset = (page - 1) * page_size
-    recommended_books = db.query(Book).filter(Book.genre.in_(preferred_genres)).offset(offset).limit(page_size).all()
+    return (
+        db.query(*columns)
+        .join(UserRecommendation, UserRecommendation.book_id == Book.book_id)
+        .filter(UserRecommendation.username == username, UserRecommendation.rank.between(offset + 1, offset + page_size))
+        .order_by(UserRecommendation.rank)
+        .all()
+    )
+
+def is_feed_generated(db: Session, username: str) -> bool:
+    return db.query(UserFeed.username).filter(UserFeed.username == username).first() is not None
+
+def get_recommended_books(db: Session, username: str, page: int = 1, page_size: int = 10, columns: tuple = BOOK_COLUMNS) -> list:
+    recommended_books = get_feed_page(db, username, page, page_size, columns)
 
     if not recommended_books:
+        preferred_genre = db.query(UserPreference.preference_id).filter(UserPreference.username == username, UserPreference.preference_type == "genre").first()
+        if not preferred_genre:
+            raise HTTPException(status_code=404, detail="No preferred genres found for user, please go to the profile page to select favorite genres!")
         raise HTTPException(status_code=404, detail="No books found for preferred genres")
 
     return recommended_books
 
-def get_book_by_title(db: Session, title: str, page: int, page_size: int) -> List[Book]:
+def get_book_by_title(db: Session, title: str, page: int, page_size: int, columns: tuple = BOOK_COLUMNS) -> list:
     offset = (page - 1) * page_size
-    return db.query(Book).filter(Book.title.ilike(f"%{title}%")).offset(offset).limit(page_size).all()
+    return db.query(*columns).filter(Book.title.ilike(f"%{title}%")).offset(offset).limit(page_size).all()
 
-def get_books_sorted(db: Session, order: str, page: int, page_size: int) -> List[Book]:
+def get_books_sorted(db: Session, order: str, page: int, page_size: int, columns: tuple = BOOK_COLUMNS) -> list:
     order_by_clause = Book.average_rating.asc() if order == 'asc' else Book.average_rating.desc()
-    return db.query(Book).order_by(order_by_clause).offset((page - 1) * page_size).limit(page_size).all()
+    return db.query(*columns).order_by(order_by_clause).offset((page - 1) * page_size).limit(page_size).all()
 
 def like_book(db: Session, username: str, book_id: int) -> UserLikedBook:
     db_book = db.query(Book).filter(Book.book_id == book_id).first()
@@ -103,6 +171,8 @@ def like_book(db: Session, username: str, book_id: int) -> UserLikedBook:
 
     try:
         db.add(user_liked_book)
+        # the counter moves in the same transaction as the like row, so they can only drift via out-of-band writes
+        db.execute(update(Book).where(Book.book_id == book_id).values(like_count=Book.like_count + 1))
         db.commit()
         db.refresh(user_liked_book)
     except IntegrityError:
@@ -117,22 +187,78 @@ def unlike_book(db: Session, username: str, book_id: int) -> dict:
         raise HTTPException(status_code=404, detail="Like not found")
 
     db.delete(user_liked_book)
+    db.execute(update(Book).where(Book.book_id == book_id).values(like_count=Book.like_count - 1))
     db.commit()
     return {"message": "Book unliked successfully"}
 
-def get_liked_books(db: Session, username: str) -> List[Book]:
-    liked_books = db.query(UserLikedBook).filter(UserLikedBook.username == username).all()
-    book_ids = [like.book_id for like in liked_books]
-    return db.query(Book).filter(Book.book_id.in_(book_ids)).all()
+def get_liked_books(db: Session, username: str, page: int = 1, page_size: int = 10, columns: tuple = BOOK_COLUMNS) -> list:
+    offset = (page - 1) * page_size
+    return (
+        db.query(*columns)
+        .join(UserLikedBook, UserLikedBook.book_id == Book.book_id)
+        .filter(UserLikedBook.username == username)
+        .order_by(UserLikedBook.id.desc())
+        .offset(offset)
+        .limit(page_size)
+        .all()
+    )
+
+def get_like_statuses(db: Session, username: str, book_ids: List[int]) -> Dict[int, bool]:
+    # served from the (username, book_id) unique index
+    liked = {
+        book_id for (book_id,) in db.query(UserLikedBook.book_id).filter(
+            UserLikedBook.username == username, UserLikedBook.book_id.in_(book_ids)
+        )
+    }
+    return {book_id: book_id in liked for book_id in book_ids}
 
-def get_books_by_publish_year(db: Session, order: str, page: int, page_size: int) -> List[Book]:
+def get_most_liked_books(db: Session, limit: int, after_count: Optional[int] = None, after_id: Optional[int] = None, columns: tuple = BOOK_COLUMNS) -> list:
+    # keyset pagination on (like_count, book_id) walks the composite index instead of counting past an offset
+    if (after_count is None) != (after_id is None):
+        raise HTTPException(status_code=400, detail="after_count and after_id must be given together")
+    query = db.query(*columns)
+    if after_count is not None:
+        query = query.filter(tuple_(Book.like_count, Book.book_id) < tuple_(after_count, after_id))
+    return query.order_by(Book.like_count.desc(), Book.book_id.desc()).limit(limit).all()
+
+def reconcile_like_counts(db: Session) -> int:
+    actual = select(func.count(UserLikedBook.id)).where(UserLikedBook.book_id == Book.book_id).scalar_subquery()
+    result = db.execute(
+        update(Book).where(Book.like_count != actual).values(like_count=actual),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount
+
+def get_books_by_publish_year(db: Session, order: str, page: int, page_size: int, columns: tuple = BOOK_COLUMNS) -> list:
     if order not in ["asc", "desc"]:
         raise HTTPException(status_code=400, detail="Invalid order parameter. Use 'asc' or 'desc'.")
     
     order_by_clause = Book.published_year.asc() if order == "asc" else Book.published_year.desc()
-    books = db.query(Book).order_by(order_by_clause).offset((page - 1) * page_size).limit(page_size).all()
+    books = db.query(*columns).order_by(order_by_clause).offset((page - 1) * page_size).limit(page_size).all()
     
     if not books:
         raise HTTPException(status_code=404, detail="No books found")
     
     return books
+
+def iter_book_export_batches(db: Session, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[list]:
+    # yield_per streams through a server-side cursor, so memory stays flat regardless of catalog size
+    query = (
+        select(
+            Book.book_id,
+            Book.title,
+            Book.author_id,
+            Author.name.label("author_name"),
+            Book.genre,
+            Book.description,
+            Book.average_rating,
+            Book.published_year,
+            Book.cover
+        )
+        .outerjoin(Author, Author.author_id == Book.author_id)
+        .order_by(Book.book_id)
+        .execution_options(yield_per=batch_size)
+    )
+    for batch in db.execute(query).partitions():
+        yield batch
@@ -0,0 +1,69 @@
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.common.database.models import Book, BookGenre, Genre, BOOK_COLUMNS
+from app.utils.genres import normalize_genre, parse_genres
+
+BACKFILL_CHUNK_SIZE = 1000
+
+def get_genres(db: Session) -> list:
+    return db.query(Genre.genre_id, Genre.name).order_by(Genre.name).all()
+
+def get_genre_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    names = {genre for name in names for genre in parse_genres(name)}
+    if not names:
+        return {}
+    return dict(db.query(Genre.name, Genre.genre_id).filter(Genre.name.in_(names)).all())
+
+def get_or_create_genre_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    names = set(names)
+    if not names:
+        return {}
+    db.execute(insert(Genre).values([{"name": name} for name in names]).on_conflict_do_nothing(index_elements=["name"]))
+    return dict(db.query(Genre.name, Genre.genre_id).filter(Genre.name.in_(names)).all())
+
+def sync_book_genres(db: Session, books: Iterable[Tuple[int, Optional[str]]]) -> None:
+    parsed = {book_id: parse_genres(raw_genre) for book_id, raw_genre in books}
+    if not parsed:
+        return
+
+    genre_ids = get_or_create_genre_ids(db, {genre for genres in parsed.values() for genre in genres})
+    db.execute(delete(BookGenre).where(BookGenre.book_id.in_(parsed)))
+    links = [{"book_id": book_id, "genre_id": genre_ids[genre]} for book_id, genres in parsed.items() for genre in genres]
+    if links:
+        db.execute(insert(BookGenre).values(links).on_conflict_do_nothing())
+    db.commit()
+
+def backfill_book_genres(db: Session, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    # keyset pagination rather than a server-side cursor, since every chunk commits
+    last_book_id, processed = 0, 0
+    while True:
+        chunk = (
+            db.query(Book.book_id, Book.genre)
+            .filter(Book.book_id > last_book_id)
+            .order_by(Book.book_id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not chunk:
+            return processed
+        sync_book_genres(db, chunk)
+        last_book_id = chunk[-1].book_id
+        processed += len(chunk)
+
+def get_books_by_genre(db: Session, genre: str, page: int, page_size: int, columns: tuple = BOOK_COLUMNS) -> list:
+    name = normalize_genre(genre)
+    if not name:
+        return []
+    offset = (page - 1) * page_size
+    return (
+        db.query(*columns)
+        .join(BookGenre, BookGenre.book_id == Book.book_id)
+        .join(Genre, Genre.genre_id == BookGenre.genre_id)
+        .filter(Genre.name == name)
+        .order_by(Book.book_id)
+        .offset(offset)
+        .limit(page_size)
+        .all()
+    )
@@ -0,0 +1,76 @@
+from typing import Iterable, Optional
+from sqlalchemy import String, cast, delete, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+from app.common.database.models import Book, BookGenre, BookRanking, Genre, BOOK_COLUMNS
+from app.utils.genres import parse_genres
+
+GENRE_SCOPE = "genre"
+AUTHOR_SCOPE = "author"
+TOP_K_MAX = 100
+RANKINGS_LOCK = "rankings"
+
+def ranking_key(scope: str):
+    if scope == GENRE_SCOPE:
+        return Genre.name
+    return cast(Book.author_id, String)
+
+def ranked_books(scope: str, partition: bool):
+    key = ranking_key(scope)
+    order = (Book.average_rating.desc().nullslast(), Book.book_id)
+    rank = func.row_number().over(partition_by=key if partition else None, order_by=order)
+    query = select(
+        literal(scope).label("scope"),
+        key.label("key"),
+        rank.label("rank"),
+        Book.book_id,
+        Book.average_rating
+    ).where(key.isnot(None))
+    if scope == GENRE_SCOPE:
+        query = query.join(BookGenre, BookGenre.book_id == Book.book_id).join(Genre, Genre.genre_id == BookGenre.genre_id)
+    return query
+
+def lock_rankings(db: Session, scoped_keys: Iterable[tuple] = (), exclusive: bool = False) -> None:
+    # a refresh deletes and re-inserts a key's rows, so two overlapping ones would collide on (scope, key, rank):
+    # key refreshes share the table lock and queue on their own keys, the full refresh takes the table lock alone.
+    # transaction-scoped, taken in a fixed order, released by the commit
+    lock = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+    db.execute(text(f"SELECT {lock}(hashtext(:name))"), {"name": RANKINGS_LOCK})
+    for scope, key in sorted(scoped_keys):
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": f"{scope}:{key}"})
+
+def refresh_ranking(db: Session, scope: str, key: str) -> None:
+    lock_rankings(db, [(scope, key)])
+    ranked = ranked_books(scope, partition=False).where(ranking_key(scope) == key).limit(TOP_K_MAX)
+    db.execute(delete(BookRanking).where(BookRanking.scope == scope, BookRanking.key == key))
+    db.execute(insert(BookRanking).from_select(
+        ["scope", "key", "rank", "book_id", "average_rating"], ranked
+    ))
+
+def refresh_book_rankings(db: Session, genres: Iterable[Optional[str]] = (), author_ids: Iterable[Optional[int]] = ()) -> None:
+    scoped_keys = {(GENRE_SCOPE, genre) for raw_genre in genres for genre in parse_genres(raw_genre)}
+    scoped_keys |= {(AUTHOR_SCOPE, str(author_id)) for author_id in author_ids if author_id is not None}
+    # every key is locked up front, so two writers touching the same keys cannot deadlock
+    lock_rankings(db, scoped_keys)
+    for scope, key in sorted(scoped_keys):
+        refresh_ranking(db, scope, key)
+    db.commit()
+
+def refresh_all_rankings(db: Session) -> None:
+    lock_rankings(db, exclusive=True)
+    db.execute(delete(BookRanking))
+    for scope in (GENRE_SCOPE, AUTHOR_SCOPE):
+        ranked = ranked_books(scope, partition=True).subquery()
+        db.execute(insert(BookRanking).from_select(
+            ["scope", "key", "rank", "book_id", "average_rating"],
+            select(ranked).where(ranked.c.rank <= TOP_K_MAX)
+        ))
+    db.commit()
+
+def get_top_books(db: Session, scope: str, key: str, k: int, columns: tuple = BOOK_COLUMNS) -> list:
+    return (
+        db.query(*columns)
+        .join(BookRanking, BookRanking.book_id == Book.book_id)
+        .filter(BookRanking.scope == scope, BookRanking.key == key, BookRanking.rank <= min(k, TOP_K_MAX))
+        .order_by(BookRanking.rank)
+        .all()
+    )
@@ -1,7 +1,9 @@
-from typing import List
+from typing import List, Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.common.database.models import User
+from app.common.database.models import Book, User, UserLikedBook, UserPreference
 from app.schemas.user import UserSchema
 from app.middleware.auth import get_password_hash, verify_password
 
@@ -34,10 +36,38 @@ def get_users_with_pagination(db: Session, page: int, page_size: int) -> List[Us
     offset = (page - 1) * page_size
     return db.query(User).limit(page_size).offset(offset).all()
 
-def delete_user(db: Session, username: str) -> User:
-    user = get_user_by_username(db, username)
-    if not user:
+def delete_user(db: Session, username: str) -> None:
+    # the user's likes disappear through ON DELETE CASCADE, so settle the denormalized counters first
+    liked_book_ids = select(UserLikedBook.book_id).where(UserLikedBook.username == username)
+    db.execute(
+        update(Book).where(Book.book_id.in_(liked_book_ids)).values(like_count=Book.like_count - 1),
+        execution_options={"synchronize_session": False}
+    )
+    # a single statement; preferences, likes, feed and activity history go with it in the database
+    result = db.execute(delete(User).where(User.username == username))
+    if result.rowcount == 0:
+        db.rollback()
         raise HTTPException(status_code=404, detail="User not found")
-    db.delete(user)
     db.commit()
-    return user
+
+def get_preferences(db: Session, username: str, preference_type: Optional[str] = None) -> list:
+    query = db.query(UserPreference.preference_type, UserPreference.preference_value).filter(UserPreference.username == username)
+    if preference_type:
+        query = query.filter(UserPreference.preference_type == preference_type)
+    return query.order_by(UserPreference.preference_type, UserPreference.preference_value).all()
+
+def set_preferences(db: Session, username: str, preference_type: str, values: List[str]) -> None:
+    # one DELETE for everything deselected and one multi-row upsert for the rest, whatever the size of the change
+    values = list(dict.fromkeys(values))
+    stale = delete(UserPreference).where(UserPreference.username == username, UserPreference.preference_type == preference_type)
+    if values:
+        stale = stale.where(UserPreference.preference_value.not_in(values))
+    db.execute(stale)
+
+    if values:
+        db.execute(
+            insert(UserPreference)
+            .values([{"username": username, "preference_type": preference_type, "preference_value": value} for value in values])
+            .on_conflict_do_nothing(constraint="uq_userpreferences_username_type_value")
+        )
+    db.commit()
@@ -1,8 +1,34 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, create_engine
+import enum
+from sqlalchemy import Column, Integer, String, Date, DateTime, Enum, ForeignKey, Float, Index, UniqueConstraint, create_engine
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.common.database.database import Base
 
+class ActivityType(str, enum.Enum):
+    USER_REGISTRATION = "user_registration"
+    USER_LOGIN = "user_login"
+    PROFILE_VIEW = "profile_view"
+    USER_DELETE = "user_delete"
+    BOOK_VIEW = "book_view"
+    BOOK_CREATE = "book_create"
+    BOOK_BULK_CREATE = "book_bulk_create"
+    BOOK_UPDATE = "book_update"
+    BOOK_DELETE = "book_delete"
+    BOOK_LIKE = "book_like"
+    BOOK_UNLIKE = "book_unlike"
+    LIKED_BOOKS_VIEW = "liked_books_view"
+    RECOMMENDATIONS_VIEW = "recommendations_view"
+    AUTHOR_SEARCH = "author_search"
+    AUTHOR_CREATE = "author_create"
+    AUTHOR_BULK_CREATE = "author_bulk_create"
+    AUTHOR_UPDATE = "author_update"
+    AUTHOR_DELETE = "author_delete"
+    GENRE_BACKFILL = "genre_backfill"
+    RANKINGS_REFRESH = "rankings_refresh"
+    LIKE_COUNT_RECONCILE = "like_count_reconcile"
+    CATALOG_EXPORT = "catalog_export"
+
 class User(Base):
     __tablename__ = "users"
 
@@ -10,32 +36,62 @@ class User(Base):
     password_hash = Column(String)
     role = Column(String)
 
-    preferences = relationship("UserPreference", back_populates="user")
-    activities = relationship("UserActivity", back_populates="user")
-    liked_books = relationship("UserLikedBook", back_populates="user")
-    activities = relationship("UserActivity", cascade="all, delete-orphan", back_populates="user")
+    # dependents are removed by ON DELETE CASCADE, so deleting a user never loads its history
+    preferences = relationship("UserPreference", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    activities = relationship("UserActivity", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    liked_books = relationship("UserLikedBook", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class UserPreference(Base):
     __tablename__ = "userpreferences"
 
     preference_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    username = Column(String, ForeignKey("users.username"))
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"))
     preference_type = Column(String)
     preference_value = Column(String)
 
     user = relationship("User", back_populates="preferences")
 
+    __table_args__ = (
+        UniqueConstraint("username", "preference_type", "preference_value", name="uq_userpreferences_username_type_value"),
+    )
+
 class UserActivity(Base):
     __tablename__ = "user_activities"
 
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, ForeignKey("users.username"))
+    # partitioned by month on timestamp, so the partition key has to be part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"))
+    event_type = Column(Enum(ActivityType, name="activity_type", values_callable=lambda types: [t.value for t in types]))
+    target_id = Column(Integer)
+    payload = Column(JSONB)
+    # free-text description, only present on rows written before event types existed
     activity = Column(String)
-    timestamp = Column(DateTime, default=datetime.now(timezone.utc))
+    timestamp = Column(DateTime, primary_key=True, default=lambda: datetime.now(timezone.utc))
 
     user = relationship("User", back_populates="activities")
 
+    __table_args__ = (
+        Index("ix_user_activities_username_timestamp", "username", "timestamp"),
+        Index("ix_user_activities_event_target_timestamp", "event_type", "target_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+class UserActivityDaily(Base):
+    __tablename__ = "user_activity_daily"
+
+    day = Column(Date, primary_key=True)
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"), primary_key=True)
+    activity_count = Column(Integer)
+
+class BookSearchDaily(Base):
+    __tablename__ = "book_search_daily"
+
+    # no foreign key: search history outlives deleted books
+    day = Column(Date, primary_key=True)
+    book_id = Column(Integer, primary_key=True)
+    search_count = Column(Integer)
+
 class Author(Base):
     __tablename__ = "authors"
 
@@ -53,19 +109,87 @@ class Book(Base):
     author_id = Column(Integer, ForeignKey("authors.author_id"))
     genre = Column(String)
     description = Column(String)
-    average_rating = Column(Float)  
+    average_rating = Column(Float, index=True)
     published_year = Column(Integer)  
     cover = Column(String)  
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     author = relationship("Author", back_populates="books")
     liked_by = relationship("UserLikedBook", back_populates="book")
+    genres = relationship("Genre", secondary="book_genres", viewonly=True)
+
+    __table_args__ = (
+        Index("ix_books_like_count_book_id", "like_count", "book_id"),
+    )
 
 class UserLikedBook(Base):
     __tablename__ = "user_liked_books"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    username = Column(String, ForeignKey("users.username"))
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"))
     book_id = Column(Integer, ForeignKey("books.book_id"))
 
     user = relationship("User", back_populates="liked_books")
     book = relationship("Book", back_populates="liked_by")
+
+    __table_args__ = (
+        UniqueConstraint("username", "book_id", name="uq_user_liked_books_username_book_id"),
+    )
+
+# plain column selection for list endpoints, so rows skip ORM identity-map and per-row validation overhead
+BOOK_COLUMNS = (
+    Book.book_id,
+    Book.title,
+    Book.author_id,
+    Book.genre,
+    Book.description,
+    Book.average_rating,
+    Book.published_year,
+    Book.cover,
+    Book.like_count
+)
+AUTHOR_COLUMNS = (Author.author_id, Author.name, Author.biography)
+
+class UserRecommendation(Base):
+    __tablename__ = "user_recommendations"
+
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.book_id", ondelete="CASCADE"))
+    score = Column(Float)
+    generated_at = Column(DateTime)
+
+    book = relationship("Book")
+
+class UserFeed(Base):
+    __tablename__ = "user_feeds"
+
+    # written on every feed build, also when the feed came out empty, so an empty feed is not rescored on each read
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"), primary_key=True)
+    size = Column(Integer, nullable=False, default=0)
+    generated_at = Column(DateTime)
+
+class BookRanking(Base):
+    __tablename__ = "book_rankings"
+
+    scope = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.book_id", ondelete="CASCADE"))
+    average_rating = Column(Float)
+
+    book = relationship("Book")
+
+class Genre(Base):
+    __tablename__ = "genres"
+
+    genre_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    name = Column(String, unique=True, index=True)
+
+class BookGenre(Base):
+    __tablename__ = "book_genres"
+
+    book_id = Column(Integer, ForeignKey("books.book_id", ondelete="CASCADE"), primary_key=True)
+    genre_id = Column(Integer, ForeignKey("genres.genre_id", ondelete="CASCADE"), primary_key=True, index=True)
+
+    genre = relationship("Genre")
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from sqlalchemy import text
+from app.common.database.database import engine, get_db
+from app.common.CRUD.ranking_crud import refresh_all_rankings
+from app.common.CRUD.book_crud import reconcile_like_counts
+from app.common.CRUD.activity_crud import ensure_activity_partitions, rollup_pending_days, apply_activity_retention
+
+RANKINGS_REFRESH_INTERVAL = 60 * 60
+LIKE_COUNT_RECONCILE_INTERVAL = 24 * 60 * 60
+ACTIVITY_MAINTENANCE_INTERVAL = 6 * 60 * 60
+
+def refresh_rankings_job():
+    with next(get_db()) as db:
+        refresh_all_rankings(db)
+
+def reconcile_like_counts_job():
+    with next(get_db()) as db:
+        reconcile_like_counts(db)
+
+def prepare_activity_partitions():
+    with next(get_db()) as db:
+        ensure_activity_partitions(db)
+
+def activity_maintenance_job():
+    with next(get_db()) as db:
+        ensure_activity_partitions(db)
+        rollup_pending_days(db)
+        apply_activity_retention(db)
+
+jobs = [
+    (refresh_rankings_job, RANKINGS_REFRESH_INTERVAL),
+    (reconcile_like_counts_job, LIKE_COUNT_RECONCILE_INTERVAL),
+    (activity_maintenance_job, ACTIVITY_MAINTENANCE_INTERVAL),
+]
+
+def run_exclusively(job) -> None:
+    # every worker schedules the jobs; the advisory lock skips a round while another worker is already running it
+    with engine.connect() as connection:
+        lock_key = {"name": f"jobs.{job.__name__}"}
+        if not connection.execute(text("SELECT pg_try_advisory_lock(hashtext(:name))"), lock_key).scalar():
+            return
+        try:
+            job()
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), lock_key)
+
+async def run_periodically(job, interval: float):
+    while True:
+        try:
+            await asyncio.to_thread(run_exclusively, job)
+        except Exception:
+            logging.exception(f"Scheduled job {job.__name__} failed")
+        await asyncio.sleep(interval)
+
+def start_jobs():
+    return [asyncio.create_task(run_periodically(job, interval)) for job, interval in jobs]
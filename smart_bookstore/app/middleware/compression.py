@@ -0,0 +1,26 @@
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+COMPRESSION_MINIMUM_SIZE = 1000
+# SSE must flush every token and the export already offers its own gzip, so neither goes through the compressor
+UNCOMPRESSED_PATHS = ("/chat", "/admin/books/export")
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MINIMUM_SIZE, excluded_paths: tuple = UNCOMPRESSED_PATHS):
+        self.app = app
+        self.excluded_paths = excluded_paths
+        if BrotliMiddleware is not None:
+            self.compressed_app = BrotliMiddleware(app, quality=4, minimum_size=minimum_size, gzip_fallback=True)
+        else:
+            self.compressed_app = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not scope["path"].startswith(self.excluded_paths):
+            await self.compressed_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
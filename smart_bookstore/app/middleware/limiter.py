@@ -0,0 +1,90 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, Request, status
+from app.middleware.auth import verify_token
+
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrent: int, max_per_user: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._per_user = defaultdict(int)
+        self._waiting = 0
+
+    def _reject(self, status_code: int, detail: str):
+        raise HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(self.retry_after)})
+
+    async def acquire(self, key: str) -> None:
+        if self._per_user.get(key, 0) >= self.max_per_user:
+            self._reject(status.HTTP_429_TOO_MANY_REQUESTS, "Too many concurrent requests for this user")
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._reject(status.HTTP_503_SERVICE_UNAVAILABLE, "Server is busy, please try again later")
+
+        self._per_user[key] += 1
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._forget(key)
+            self._reject(status.HTTP_503_SERVICE_UNAVAILABLE, "Server is busy, please try again later")
+        except BaseException:
+            self._forget(key)
+            raise
+        finally:
+            self._waiting -= 1
+
+    async def try_reserve(self) -> bool:
+        # takes a slot from the global budget only if one is free right now, without queueing or rejecting;
+        # it is not counted against any user until claim(), so speculative work never uses up a user's own slots
+        if self._semaphore.locked():
+            return False
+        # an unlocked semaphore is acquired without suspending
+        await self._semaphore.acquire()
+        return True
+
+    def unreserve(self) -> None:
+        self._semaphore.release()
+
+    def claim(self, key: str) -> None:
+        # turns a reserved slot into the user's slot, to be freed with release(key)
+        if self._per_user.get(key, 0) >= self.max_per_user:
+            self._reject(status.HTTP_429_TOO_MANY_REQUESTS, "Too many concurrent requests for this user")
+        self._per_user[key] += 1
+
+    def release(self, key: str) -> None:
+        self._semaphore.release()
+        self._forget(key)
+
+    def _forget(self, key: str) -> None:
+        self._per_user[key] -= 1
+        if self._per_user[key] <= 0:
+            del self._per_user[key]
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+# admission control for every /chat request (deterministic intents only need this one)
+chat_limiter = ConcurrencyLimiter(max_concurrent=32, max_per_user=2, max_queue=64, queue_timeout=10, retry_after=5)
+# the retrieval + LLM recommendation path is much more expensive, so it gets its own tighter budget
+recommendation_limiter = ConcurrencyLimiter(max_concurrent=8, max_per_user=1, max_queue=16, queue_timeout=15, retry_after=10)
+
+def get_client_key(request: Request) -> str:
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            username = verify_token(token).get("sub")
+            if username:
+                return f"user:{username}"
+        except HTTPException:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
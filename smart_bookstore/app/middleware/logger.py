@@ -1,12 +1,15 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from datetime import timezone
 from datetime import datetime
-from app.common.database.models import UserActivity
+from app.common.database.models import ActivityType, UserActivity
 
-def log_user_activity(db: Session, username: str, activity: str):
+def log_user_activity(db: Session, username: str, event_type: ActivityType, target_id: Optional[int] = None, payload: Optional[dict] = None):
     new_activity = UserActivity(
         username=username,
-        activity=activity,
+        event_type=event_type,
+        target_id=target_id,
+        payload=payload,
         timestamp=datetime.now(timezone.utc)
     )
     db.add(new_activity)
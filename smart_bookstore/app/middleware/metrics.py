@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+SLOW_QUERY_SECONDS = 0.2
+UNMATCHED_ROUTE = "unmatched"
+BACKGROUND_ROUTE = "background"
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class RequestStats:
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.queries = 0
+
+class MetricsRegistry:
+    def __init__(self):
+        # sync routes run in the threadpool, so the SQL hooks update these from worker threads
+        self.lock = threading.Lock()
+        self.request_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.request_queries: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.in_flight = 0
+        self.queries = 0
+        self.slow_queries: Dict[str, int] = defaultdict(int)
+        self.query_seconds = 0.0
+
+    def request_started(self) -> None:
+        with self.lock:
+            self.in_flight += 1
+
+    def request_finished(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            key = (method, route)
+            self.request_latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.request_queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.responses[(method, route, status_code)] += 1
+
+    def query_finished(self, seconds: float, route: str) -> None:
+        with self.lock:
+            self.queries += 1
+            self.query_seconds += seconds
+            if seconds >= SLOW_QUERY_SECONDS:
+                self.slow_queries[route] += 1
+
+registry = MetricsRegistry()
+# the threadpool copies the context, so sync routes and their queries still see the request they belong to
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def route_template(scope: Scope) -> str:
+    # the template (/books/{book_id}) rather than the raw path, so label cardinality stays bounded
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+        registry.request_started()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # streamed responses are timed until their last chunk is sent
+            registry.request_finished(scope["method"], route_template(scope), status_code, time.perf_counter() - start, stats)
+            current_request.reset(token)
+
+def install_query_hooks(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        stats = current_request.get()
+        route = route_template(stats.scope) if stats is not None else BACKGROUND_ROUTE
+        if stats is not None:
+            stats.queries += 1
+        registry.query_finished(seconds, route)
+        if seconds >= SLOW_QUERY_SECONDS:
+            logging.warning(f"Slow query ({seconds * 1000:.0f}ms) in {route}: {statement[:500]}")
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(**labels) -> str:
+    return ",".join(f'{name}="{escape_label(str(value))}"' for name, value in labels.items())
+
+def render_histogram(lines: list, name: str, histograms: Dict[Tuple[str, str], Histogram]) -> None:
+    for (method, route), histogram in sorted(histograms.items()):
+        labels = format_labels(method=method, route=route)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+def render_metrics() -> str:
+    # Prometheus text exposition format (version 0.0.4)
+    with registry.lock:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency per route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        render_histogram(lines, "http_request_duration_seconds", registry.request_latency)
+        lines += [
+            "# HELP http_request_db_queries Database queries issued per request.",
+            "# TYPE http_request_db_queries histogram",
+        ]
+        render_histogram(lines, "http_request_db_queries", registry.request_queries)
+        lines += [
+            "# HELP http_responses_total Responses per route template and status code.",
+            "# TYPE http_responses_total counter",
+        ]
+        for (method, route, status_code), count in sorted(registry.responses.items()):
+            lines.append(f"http_responses_total{{{format_labels(method=method, route=route, status=status_code)}}} {count}")
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {registry.in_flight}",
+            "# HELP db_queries_total Database queries executed, including background jobs.",
+            "# TYPE db_queries_total counter",
+            f"db_queries_total {registry.queries}",
+            "# HELP db_query_seconds_total Time spent executing database queries.",
+            "# TYPE db_query_seconds_total counter",
+            f"db_query_seconds_total {registry.query_seconds}",
+            f"# HELP db_slow_queries_total Queries slower than {SLOW_QUERY_SECONDS}s per route template.",
+            "# TYPE db_slow_queries_total counter",
+        ]
+        for route, count in sorted(registry.slow_queries.items()):
+            lines.append(f"db_slow_queries_total{{{format_labels(route=route)}}} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from typing import List
+from app.common.database.database import get_db
+from app.schemas.analytics import TopSearchedBookSchema, BookViewsSchema, DailyActiveUsersSchema
+from app.middleware.auth import admin_required
+from app.utils.responses import rows_response
+from app.common.database.models import ActivityType
+from app.common.CRUD.activity_crud import get_top_searched_books, get_daily_active_users, count_events
+
+router = APIRouter()
+
+@router.get("/admin/analytics/top_searched_books", response_model=List[TopSearchedBookSchema], response_class=ORJSONResponse, tags=["Admin"])
+def get_top_searched_books_route(days: int = 30, limit: int = 10, db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
+    return rows_response(get_top_searched_books(db, days, limit))
+
+@router.get("/admin/analytics/daily_active_users", response_model=List[DailyActiveUsersSchema], response_class=ORJSONResponse, tags=["Admin"])
+def get_daily_active_users_route(days: int = 30, db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
+    return rows_response(get_daily_active_users(db, days))
+
+@router.get("/admin/analytics/books/{book_id}/views", response_model=BookViewsSchema, tags=["Admin"])
+def get_book_views_route(book_id: int, hours: int = 24, db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    return {"book_id": book_id, "hours": hours, "views": count_events(db, ActivityType.BOOK_VIEW, book_id, since)}
@@ -1,21 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 from app.common.database.database import get_db
 from app.schemas.author import AuthorSchema, SAuthorSchema
+from app.schemas.bulk import BulkResultSchema
+from app.utils.bulk import iter_validated_chunks
+from app.utils.responses import rows_response
 from app.middleware.auth import get_current_user, admin_required
 from app.middleware.logger import log_user_activity
+from app.common.database.models import ActivityType
 from app.common.CRUD.author_crud import (
     get_authors,
     get_author_by_id,
     create_author,
+    create_authors_bulk,
     update_author,
     delete_author
 )
 
 router = APIRouter()
 
-@router.get("/authors", response_model=List[SAuthorSchema], tags=["Authors"], operation_id="get_authors_list")
+@router.get("/authors", response_model=List[SAuthorSchema], response_class=ORJSONResponse, tags=["Authors"], operation_id="get_authors_list")
 def get_authors_route(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
@@ -23,8 +30,8 @@ def get_authors_route(
     page_size: int = 10,
     name: str = None
 ):
-    log_user_activity(db, current_user['username'], "Searched for authors")
-    return get_authors(db, page, page_size, name)
+    log_user_activity(db, current_user['username'], ActivityType.AUTHOR_SEARCH, payload={"name": name} if name else None)
+    return rows_response(get_authors(db, page, page_size, name))
 
 
 @router.get("/authors/{author_id}", response_model=AuthorSchema, tags=["Authors"], operation_id="get_author_by_id")
@@ -40,8 +47,20 @@ def create_author_route(
     db: Session = Depends(get_db),
     current_user: dict = Depends(admin_required)
 ):
-    log_user_activity(db, current_user['username'], "Author creation")
-    return create_author(db, author)
+    new_author = create_author(db, author)
+    log_user_activity(db, current_user['username'], ActivityType.AUTHOR_CREATE, target_id=new_author.author_id)
+    return new_author
+
+@router.post("/authors/bulk", response_model=BulkResultSchema, tags=["Authors"], operation_id="create_author_records_bulk")
+async def create_authors_bulk_route(request: Request, db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
+    errors, inserted = [], 0
+    async for chunk in iter_validated_chunks(request, AuthorSchema, errors):
+        chunk_inserted, chunk_errors = await run_in_threadpool(create_authors_bulk, db, chunk)
+        inserted += chunk_inserted
+        errors.extend(chunk_errors)
+
+    await run_in_threadpool(log_user_activity, db, current_user['username'], ActivityType.AUTHOR_BULK_CREATE, payload={"inserted": inserted, "errors": len(errors)})
+    return {"inserted": inserted, "errors": sorted(errors, key=lambda error: error["index"])}
 
 @router.put("/authors/{author_id}", response_model=AuthorSchema, tags=["Authors"], operation_id="update_author_record")
 def update_author_route(
@@ -52,7 +71,7 @@ def update_author_route(
 ):
     try:
         updated_author = update_author(db, author_id, author)
-        log_user_activity(db, current_user['username'], "Author update")
+        log_user_activity(db, current_user['username'], ActivityType.AUTHOR_UPDATE, target_id=author_id)
         return updated_author
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -65,7 +84,7 @@ def delete_author_route(
 ):
     try:
         delete_author(db, author_id)
-        log_user_activity(db, current_user['username'], "Author deletion")
+        log_user_activity(db, current_user['username'], ActivityType.AUTHOR_DELETE, target_id=author_id)
         return {"message": "Author deleted successfully"}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -1,97 +1,206 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.common.database.database import get_db
-from app.schemas.book import ModBookSchema, BookSchema, UserLikedBook
+from app.schemas.book import ModBookSchema, BookSchema, UserLikedBook, LikeStatusSchema
+from app.schemas.bulk import BulkResultSchema
+from app.utils.bulk import iter_validated_chunks
+from app.utils.export import exporters, gzip_chunks
+from app.utils.responses import rows_response
 from app.middleware.auth import get_current_user, admin_required
 from app.middleware.logger import log_user_activity
+from app.common.database.models import ActivityType
+from app.common.AI.recommender import refresh_user_feed, refresh_user_feed_task
+from app.common.CRUD.ranking_crud import GENRE_SCOPE, AUTHOR_SCOPE, get_top_books, refresh_all_rankings, refresh_book_rankings
+from app.utils.genres import normalize_genre
 from app.common.CRUD.book_crud import (
     get_books,
     get_book_by_id,
     get_recommended_books,
+    is_feed_generated,
     delete_book,
     create_book,
+    create_books_bulk,
     update_book,
     get_book_by_title,
     get_books_sorted,
     like_book,
     unlike_book,
     get_liked_books,
-    get_books_by_publish_year
+    get_like_statuses,
+    get_books_by_publish_year,
+    get_most_liked_books,
+    reconcile_like_counts,
+    select_book_columns,
+    iter_book_export_batches,
+    EXPORT_COLUMNS
 )
 
 router = APIRouter()
 
+MAX_LIKE_STATUS_IDS = 200
+MAX_MOST_LIKED_LIMIT = 100
+
 # @router.get("/books", response_model=List[BookSchema], tags=["Books"], operation_id="get_books_list")
 # def get_all_books(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user), page: int = 1, page_size: int = 1):
 #     log_user_activity(db, current_user['username'], "Searched for all books")
 #     return get_books(db, page, page_size)
 
-@router.get("/books", response_model=List[BookSchema], tags=["Books"], operation_id="get_books_list")
-def get_all_books(db: Session = Depends(get_db), page: int = 1, page_size: int = 1):
-    return get_books(db, page, page_size)
+@router.get("/books", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Books"], operation_id="get_books_list")
+def get_all_books(db: Session = Depends(get_db), page: int = 1, page_size: int = 1, fields: Optional[str] = None):
+    return rows_response(get_books(db, page, page_size, select_book_columns(fields)))
+
+# registered before /books/{book_id} so "most_liked" is not parsed as a book id
+@router.get("/books/most_liked", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Books"], operation_id="get_most_liked_books")
+def get_most_liked_books_route(
+    limit: int = Query(10, ge=1, le=MAX_MOST_LIKED_LIMIT),
+    after_count: Optional[int] = None,
+    after_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return rows_response(get_most_liked_books(db, limit, after_count, after_id, select_book_columns(fields)))
 
 @router.get("/books/{book_id}", response_model=BookSchema, tags=["Books"], operation_id="get_book_by_id")
 def get_book(book_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     book = get_book_by_id(db, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    log_user_activity(db, current_user['username'], f"Searched for book with id: {book_id}")
+    log_user_activity(db, current_user['username'], ActivityType.BOOK_VIEW, target_id=book_id)
     return book
 
 @router.post("/books", response_model=ModBookSchema, tags=["Books"], operation_id="create_book_record")
 def create_books(book: ModBookSchema, db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
-    log_user_activity(db, current_user['username'], "Book creation")
-    return create_book(db, book)
+    new_book = create_book(db, book)
+    log_user_activity(db, current_user['username'], ActivityType.BOOK_CREATE, target_id=new_book.book_id)
+    return new_book
+
+@router.post("/books/bulk", response_model=BulkResultSchema, tags=["Books"], operation_id="create_book_records_bulk")
+async def create_books_bulk_route(request: Request, db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
+    errors, inserted, genres, author_ids = [], 0, set(), set()
+    async for chunk in iter_validated_chunks(request, ModBookSchema, errors):
+        chunk_inserted, chunk_errors = await run_in_threadpool(create_books_bulk, db, chunk)
+        inserted += len(chunk_inserted)
+        genres.update(row.genre for row in chunk_inserted)
+        author_ids.update(row.author_id for row in chunk_inserted)
+        errors.extend(chunk_errors)
+
+    await run_in_threadpool(refresh_book_rankings, db, genres, author_ids)
+    await run_in_threadpool(log_user_activity, db, current_user['username'], ActivityType.BOOK_BULK_CREATE, payload={"inserted": inserted, "errors": len(errors)})
+    return {"inserted": inserted, "errors": sorted(errors, key=lambda error: error["index"])}
 
 @router.put("/books/{book_id}", response_model=ModBookSchema, tags=["Books"], operation_id="update_book_record")
 def update_books(book_id: int, book: ModBookSchema, db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
-    log_user_activity(db, current_user['username'], "Book update")
+    log_user_activity(db, current_user['username'], ActivityType.BOOK_UPDATE, target_id=book_id)
     return update_book(db, book_id, book)
 
 @router.delete("/books/{book_id}", tags=["Books"], operation_id="delete_book_record")
 def delete_books(book_id: int, db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
-    log_user_activity(db, current_user['username'], "Book deletion")
+    log_user_activity(db, current_user['username'], ActivityType.BOOK_DELETE, target_id=book_id)
     return delete_book(db, book_id)
 
-@router.get("/recommendations", response_model=List[BookSchema], tags=["Recommendations"])
-def get_recommended_books_route(page: int = 1, page_size: int = 10, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+@router.get("/recommendations", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Recommendations"])
+def get_recommended_books_route(page: int = 1, page_size: int = 10, fields: Optional[str] = None, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     try:
-        log_user_activity(db, current_user['username'], "Viewed their recommendations")
-        return get_recommended_books(db, current_user["username"], page, page_size)
+        log_user_activity(db, current_user['username'], ActivityType.RECOMMENDATIONS_VIEW, payload={"page": page})
+        # a feed is built here once per user; after that it is only rebuilt in the background when likes or preferences change
+        if not is_feed_generated(db, current_user["username"]):
+            refresh_user_feed(db, current_user["username"])
+        return rows_response(get_recommended_books(db, current_user["username"], page, page_size, select_book_columns(fields)))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-@router.get("/books/title/{title}", response_model=List[BookSchema], tags=["Books"], operation_id="get_book_by_title")
-def get_book_by_title_route(title: str, page: int = 1, page_size: int = 10, db: Session = Depends(get_db)):
-    books = get_book_by_title(db, title, page, page_size)
+@router.get("/books/title/{title}", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Books"], operation_id="get_book_by_title")
+def get_book_by_title_route(title: str, page: int = 1, page_size: int = 10, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    books = get_book_by_title(db, title, page, page_size, select_book_columns(fields))
     if not books:
         raise HTTPException(status_code=404, detail="No books found")
-    return [BookSchema.model_validate(book) for book in books]
+    return rows_response(books)
 
-@router.get("/books/sorted_by_rating/{order}", response_model=List[BookSchema], tags=["Books"], operation_id="get_books_sorted_by_rating")
-def get_books_sorted_by_rating(order: str, page: int = 1, page_size: int = 10, db: Session = Depends(get_db)):
+@router.get("/books/sorted_by_rating/{order}", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Books"], operation_id="get_books_sorted_by_rating")
+def get_books_sorted_by_rating(order: str, page: int = 1, page_size: int = 10, fields: Optional[str] = None, db: Session = Depends(get_db)):
     if order not in ['asc', 'desc']:
         raise HTTPException(status_code=400, detail="Invalid order parameter. Use 'asc' or 'desc'.")
-    return get_books_sorted(db, order, page, page_size)
+    return rows_response(get_books_sorted(db, order, page, page_size, select_book_columns(fields)))
 
 @router.post("/books/like/{book_id}", response_model=UserLikedBook, tags=["Books"], operation_id="like_book")
-def like_book_route(book_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    log_user_activity(db, current_user['username'], f"Liked book with id: {book_id}")
-    return like_book(db, current_user['username'], book_id)
+def like_book_route(book_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    log_user_activity(db, current_user['username'], ActivityType.BOOK_LIKE, target_id=book_id)
+    liked_book = like_book(db, current_user['username'], book_id)
+    background_tasks.add_task(refresh_user_feed_task, current_user['username'])
+    return liked_book
 
 @router.delete("/books/unlike/{book_id}", tags=["Books"], operation_id="unlike_book")
-def unlike_book_route(book_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    log_user_activity(db, current_user['username'], f"Unliked book with id: {book_id}")
-    return unlike_book(db, current_user['username'], book_id)
+def unlike_book_route(book_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    log_user_activity(db, current_user['username'], ActivityType.BOOK_UNLIKE, target_id=book_id)
+    result = unlike_book(db, current_user['username'], book_id)
+    background_tasks.add_task(refresh_user_feed_task, current_user['username'])
+    return result
 
-@router.get("/books/likedbooks/", response_model=List[BookSchema], tags=["Books"], operation_id="get_liked_books")
-def get_liked_books_route(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    log_user_activity(db, current_user['username'], "Viewed their liked books")
-    return get_liked_books(db, current_user['username'])
+@router.get("/books/likedbooks/", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Books"], operation_id="get_liked_books")
+def get_liked_books_route(page: int = 1, page_size: int = 10, fields: Optional[str] = None, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    log_user_activity(db, current_user['username'], ActivityType.LIKED_BOOKS_VIEW, payload={"page": page})
+    return rows_response(get_liked_books(db, current_user['username'], page, page_size, select_book_columns(fields)))
 
-@router.get("/books/publish_year/{order}", response_model=List[BookSchema], tags=["Books"], operation_id="get_books_by_publish_year")
-def get_books_by_publish_year_route(order: str, page: int = 1, page_size: int = 10, db: Session = Depends(get_db)):
+@router.post("/books/likes/status", response_model=List[LikeStatusSchema], tags=["Books"], operation_id="get_like_statuses")
+def get_like_statuses_route(book_ids: List[int], db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    if len(book_ids) > MAX_LIKE_STATUS_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_LIKE_STATUS_IDS} book ids can be checked at once")
+    statuses = get_like_statuses(db, current_user['username'], book_ids)
+    return ORJSONResponse([{"book_id": book_id, "liked": liked} for book_id, liked in statuses.items()])
+
+@router.get("/books/publish_year/{order}", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Books"], operation_id="get_books_by_publish_year")
+def get_books_by_publish_year_route(order: str, page: int = 1, page_size: int = 10, fields: Optional[str] = None, db: Session = Depends(get_db)):
     if order not in ['asc', 'desc']:
         raise HTTPException(status_code=400, detail="Invalid order parameter. Use 'asc' or 'desc'.")
-    return get_books_by_publish_year(db, order, page, page_size)
+    return rows_response(get_books_by_publish_year(db, order, page, page_size, select_book_columns(fields)))
+
+@router.get("/books/top/genre/{genre}", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Books"], operation_id="get_top_books_by_genre")
+def get_top_books_by_genre_route(genre: str, k: int = 10, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    books = get_top_books(db, GENRE_SCOPE, normalize_genre(genre), k, select_book_columns(fields))
+    if not books:
+        raise HTTPException(status_code=404, detail="No books found")
+    return rows_response(books)
+
+@router.get("/books/top/author/{author_id}", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Books"], operation_id="get_top_books_by_author")
+def get_top_books_by_author_route(author_id: int, k: int = 10, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    books = get_top_books(db, AUTHOR_SCOPE, str(author_id), k, select_book_columns(fields))
+    if not books:
+        raise HTTPException(status_code=404, detail="No books found")
+    return rows_response(books)
+
+@router.post("/admin/rankings/refresh", tags=["Admin"], operation_id="refresh_book_rankings")
+def refresh_rankings_route(db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
+    refresh_all_rankings(db)
+    log_user_activity(db, current_user['username'], ActivityType.RANKINGS_REFRESH)
+    return {"message": "Book rankings refreshed successfully"}
+
+@router.get("/admin/books/export", tags=["Admin"], operation_id="export_books")
+def export_books_route(
+    export_format: str = Query("ndjson", alias="format"),
+    compress: bool = False,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(admin_required)
+):
+    if export_format not in exporters:
+        raise HTTPException(status_code=400, detail="Invalid format parameter. Use 'ndjson' or 'csv'.")
+    log_user_activity(db, current_user['username'], ActivityType.CATALOG_EXPORT, payload={"format": export_format, "compress": compress})
+    encoder, media_type = exporters[export_format]
+
+    def generate():
+        # the request session is closed before streaming starts, so the export opens its own
+        with next(get_db()) as export_db:
+            yield from encoder(iter_book_export_batches(export_db), EXPORT_COLUMNS)
+
+    body, filename = generate(), f"books.{export_format}"
+    if compress:
+        body, media_type, filename = gzip_chunks(body), "application/gzip", f"{filename}.gz"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.post("/admin/books/like_counts/reconcile", tags=["Admin"], operation_id="reconcile_like_counts")
+def reconcile_like_counts_route(db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
+    repaired = reconcile_like_counts(db)
+    log_user_activity(db, current_user['username'], ActivityType.LIKE_COUNT_RECONCILE, payload={"repaired": repaired})
+    return {"message": f"Like counts repaired for {repaired} books"}
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTasks
 from app.schemas.chat import QueryRequest
-from app.common.AI.chatbot import app_graph, get_session_history
+from app.common.AI.chatbot import app_graph, prepare_chat
+from app.common.AI.chat_history import get_session_history
+from app.middleware.limiter import chat_limiter, recommendation_limiter, get_client_key
 from langchain_core.messages import HumanMessage, AIMessage
 import logging
 
@@ -15,6 +18,28 @@ async def chatbot(request: Request):
     if not query:
         return StreamingResponse(iter(["No query provided."]), media_type="text/plain")
 
+    client_key = get_client_key(request)
+    await chat_limiter.acquire(client_key)
+    # intent and recommendation admission are settled here, so a shed request gets its 429/503 and Retry-After
+    try:
+        prepared = await prepare_chat(query, client_key)
+    except HTTPException:
+        chat_limiter.release(client_key)
+        raise
+    except Exception as e:
+        chat_limiter.release(client_key)
+        logging.error(f"Error during intent detection: {str(e)}")
+        return StreamingResponse(iter([f"data: Error: {str(e)}\n\n"]), media_type="text/event-stream")
+    except BaseException:
+        chat_limiter.release(client_key)
+        raise
+
+    # released once the stream finishes or the client disconnects
+    background = BackgroundTasks()
+    background.add_task(chat_limiter.release, client_key)
+    if prepared["intent"] == "book_recommendation":
+        background.add_task(recommendation_limiter.release, client_key)
+
     async def response_generator(session_id="1"):
         try:
             config = {"configurable": {"session_id": session_id}}
@@ -23,13 +48,23 @@ async def chatbot(request: Request):
             session_history.add_message(HumanMessage(content=human_input))
             initial_state = {"messages": session_history.messages}
 
-            async for event in app_graph.astream_events({"messages": initial_state["messages"]}, version="v2", config=config):
+            streamed, final_state = False, None
+            async for event in app_graph.astream_events({"messages": initial_state["messages"], **prepared}, version="v2", config=config):
                 kind = event["event"]
                 tags = event.get("tags", [])
                 if kind == "on_chat_model_stream" and "final_node" in tags:
                     content = event["data"]["chunk"].content
                     if content:
+                        streamed = True
                         yield f"data: {content}\n\n"  
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    final_state = event["data"].get("output")
+
+            # nodes that answer without a streamed model call (the unknown intent, database-only replies) send their message whole
+            if not streamed and isinstance(final_state, dict) and final_state.get("messages"):
+                last_message = final_state["messages"][-1]
+                if isinstance(last_message, AIMessage):
+                    yield f"data: {last_message.content}\n\n"
 
             yield "data: end\n\n"
 
@@ -37,4 +72,10 @@ async def chatbot(request: Request):
             logging.error(f"Error during streaming: {str(e)}")
             yield f"data: Error: {str(e)}\n\n"
 
-    return StreamingResponse(response_generator(), media_type="text/event-stream")
+    return StreamingResponse(
+        response_generator(),
+        media_type="text/event-stream",
+        # keeps nginx-style proxies from buffering the first tokens
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background
+    )
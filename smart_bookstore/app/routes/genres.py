@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.common.database.database import get_db
+from app.schemas.genre import GenreSchema
+from app.schemas.book import BookSchema
+from app.middleware.auth import admin_required
+from app.middleware.logger import log_user_activity
+from app.common.database.models import ActivityType
+from app.common.CRUD.genre_crud import get_genres, get_books_by_genre, backfill_book_genres
+from app.common.CRUD.ranking_crud import refresh_all_rankings
+from app.common.CRUD.book_crud import select_book_columns
+from app.utils.responses import rows_response
+
+router = APIRouter()
+
+@router.get("/genres", response_model=List[GenreSchema], response_class=ORJSONResponse, tags=["Genres"], operation_id="get_genres_list")
+def get_genres_route(db: Session = Depends(get_db)):
+    return rows_response(get_genres(db))
+
+@router.get("/genres/{genre}/books", response_model=List[BookSchema], response_class=ORJSONResponse, tags=["Genres"], operation_id="get_books_by_genre")
+def get_books_by_genre_route(genre: str, page: int = 1, page_size: int = 10, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    books = get_books_by_genre(db, genre, page, page_size, select_book_columns(fields))
+    if not books:
+        raise HTTPException(status_code=404, detail="No books found")
+    return rows_response(books)
+
+@router.post("/admin/genres/backfill", tags=["Admin"], operation_id="backfill_book_genres")
+def backfill_genres_route(db: Session = Depends(get_db), current_user: dict = Depends(admin_required)):
+    processed = backfill_book_genres(db)
+    refresh_all_rankings(db)
+    log_user_activity(db, current_user['username'], ActivityType.GENRE_BACKFILL, payload={"processed": processed})
+    return {"message": f"Genres backfilled for {processed} books"}
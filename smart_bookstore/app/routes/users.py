@@ -1,19 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from app.common.database.database import get_db
-from app.common.database.models import User, UserActivity, UserPreference
-from app.schemas.user import UserSchema, TokenSchema, UserActivitySchema, ViewUserSchema
+from app.common.database.models import ActivityType
+from app.schemas.user import UserSchema, TokenSchema, UserActivitySchema, ViewUserSchema, PreferenceSchema
+from app.utils.responses import rows_response
 from app.middleware.auth import create_access_token, get_current_user, admin_required
 from app.common.CRUD.user_crud import (
     get_user_by_username,
     create_user,
     authenticate_user,
     get_users_with_pagination,
-    delete_user
+    delete_user,
+    get_preferences,
+    set_preferences
 )
+from app.common.CRUD.activity_crud import get_activities
 from app.middleware.logger import log_user_activity
+from app.common.AI.recommender import refresh_user_feed_task, FEED_PREFERENCE_TYPES
 
 router = APIRouter()
 
@@ -21,7 +28,7 @@ router = APIRouter()
 def register_user(user: UserSchema, db: Session = Depends(get_db)):
     try:
         new_user = create_user(db, user)
-        log_user_activity(db, user.username, "User registration")
+        log_user_activity(db, user.username, ActivityType.USER_REGISTRATION)
         return UserSchema(username=new_user.username, password="", role=new_user.role)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -33,7 +40,7 @@ def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token(data={"sub": user.username})
-    log_user_activity(db, user.username, "User login")
+    log_user_activity(db, user.username, ActivityType.USER_LOGIN)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=UserSchema, tags=["Users"])
@@ -41,7 +48,7 @@ def read_users_me(current_user: dict = Depends(get_current_user), db: Session =
     user = get_user_by_username(db, current_user['username'])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    log_user_activity(db, current_user['username'], "User profile view")
+    log_user_activity(db, current_user['username'], ActivityType.PROFILE_VIEW)
     return UserSchema(username=user.username, password="", role=user.role)
 
 @router.get("/admin/activities", response_model=List[UserActivitySchema], tags=["Admin"])
@@ -50,15 +57,10 @@ def get_user_activities(
     current_user: dict = Depends(admin_required),
     page: int = 1,
     page_size: int = 10,
-    username: str = None
+    username: str = None,
+    since: Optional[datetime] = None
 ):
-    offset = (page - 1) * page_size
-    query = db.query(UserActivity)
-    
-    if username:
-        query = query.join(User).filter(User.username.ilike(f'%{username}%'))
-    
-    return query.limit(page_size).offset(offset).all()
+    return get_activities(db, page, page_size, username, since)
 
 
 @router.get("/admin/users", response_model=List[ViewUserSchema], tags=["Admin"])
@@ -81,31 +83,24 @@ def remove_user(
 ):
     try:
         delete_user(db, username)
-        log_user_activity(db, current_user['username'], f"Deleted user {username}")
+        log_user_activity(db, current_user['username'], ActivityType.USER_DELETE, payload={"username": username})
         return {"message": f"User '{username}' has been successfully deleted"}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e)) 
     
-@router.post("/users/preferences/genres", tags=["Users"])  # add the func to user_crud
-def update_user_genres(genres: List[str], db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    user_preferences = db.query(UserPreference).filter(UserPreference.username == current_user['username'], UserPreference.preference_type == "genre").all()
-    existing_genres = {pref.preference_value for pref in user_preferences}
-
-    # Determine genres to add and remove
-    genres_to_add = set(genres) - existing_genres
-    genres_to_remove = existing_genres - set(genres)
-
-    # Add new genres
-    for genre in genres_to_add:
-        new_preference = UserPreference(username=current_user['username'], preference_type="genre", preference_value=genre)
-        db.add(new_preference)
+@router.get("/users/preferences", response_model=List[PreferenceSchema], response_class=ORJSONResponse, tags=["Users"])
+def read_user_preferences(preference_type: Optional[str] = None, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    return rows_response(get_preferences(db, current_user['username'], preference_type))
 
-    # Remove unselected genres
-    for genre in genres_to_remove:
-        db.query(UserPreference).filter(UserPreference.username == current_user['username'], UserPreference.preference_type == "genre", UserPreference.preference_value == genre).delete()
+@router.put("/users/preferences/{preference_type}", tags=["Users"])
+def update_user_preferences(preference_type: str, values: List[str], background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    set_preferences(db, current_user['username'], preference_type, values)
+    if preference_type in FEED_PREFERENCE_TYPES:
+        background_tasks.add_task(refresh_user_feed_task, current_user['username'])
+    return {"message": f"User {preference_type} preferences updated successfully"}
 
-    db.commit()
+@router.post("/users/preferences/genres", tags=["Users"])
+def update_user_genres(genres: List[str], background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    set_preferences(db, current_user['username'], "genre", genres)
+    background_tasks.add_task(refresh_user_feed_task, current_user['username'])
     return {"message": "User genres updated successfully"}
-
-
-
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+class TopSearchedBookSchema(BaseModel):
+    book_id: int
+    title: Optional[str] = None
+    search_count: int
+
+class BookViewsSchema(BaseModel):
+    book_id: int
+    hours: int
+    views: int
+
+class DailyActiveUsersSchema(BaseModel):
+    day: date
+    active_users: int
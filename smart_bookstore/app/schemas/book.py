@@ -10,6 +10,7 @@ class BookSchema(BaseModel):
     average_rating: Optional[float] = None
     published_year: Optional[int] = None
     cover: Optional[str] = None
+    like_count: int = 0
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -26,3 +27,7 @@ class UserLikedBook(BaseModel):
     username: str
     book_id: int
 
+class LikeStatusSchema(BaseModel):
+    book_id: int
+    liked: bool
+
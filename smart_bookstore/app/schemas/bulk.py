@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import List
+
+class BulkErrorSchema(BaseModel):
+    index: int
+    detail: str
+
+class BulkResultSchema(BaseModel):
+    inserted: int
+    errors: List[BulkErrorSchema]
@@ -1,4 +1,4 @@
-from typing import Sequence, TypedDict
+from typing import List, Sequence, TypedDict
 from pydantic import BaseModel
 from langchain_core.messages import BaseMessage
 
@@ -7,4 +7,5 @@ class QueryRequest(BaseModel):
 
 class AgentState(TypedDict):
     messages: Sequence[BaseMessage]
-    intent: str
\ No newline at end of file
+    intent: str
+    context: List[str]
\ No newline at end of file
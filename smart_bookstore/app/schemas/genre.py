@@ -0,0 +1,7 @@
+from pydantic import BaseModel, ConfigDict
+
+class GenreSchema(BaseModel):
+    genre_id: int
+    name: str
+
+    model_config = ConfigDict(from_attributes=True)
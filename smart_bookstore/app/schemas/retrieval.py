@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List, Optional, Tuple
+
+class EmbedRequestSchema(BaseModel):
+    texts: List[str]
+
+class EmbedResponseSchema(BaseModel):
+    vectors: List[List[float]]
+
+class SearchRequestSchema(BaseModel):
+    queries: List[str]
+    k: int = 4
+
+class SearchResponseSchema(BaseModel):
+    results: List[List[Tuple[str, float, Optional[int]]]]
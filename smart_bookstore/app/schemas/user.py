@@ -14,9 +14,16 @@ class TokenSchema(BaseModel):
 
 class UserActivitySchema(BaseModel):
     username: str
-    activity: str
+    event_type: Optional[str] = None
+    target_id: Optional[int] = None
+    payload: Optional[dict] = None
+    activity: Optional[str] = None
     timestamp: datetime
 
+class PreferenceSchema(BaseModel):
+    preference_type: str
+    preference_value: str
+
 class ViewUserSchema(BaseModel):
     username: str
     role: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,55 @@
+import json
+from typing import Any, AsyncIterator, List, Tuple, Type
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+BULK_CHUNK_SIZE = 500
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+async def iter_json_items(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(NDJSON_CONTENT_TYPES):
+        # NDJSON is consumed line by line so large imports never sit in memory at once
+        index, buffer = 0, b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, line
+                    index += 1
+        if buffer.strip():
+            yield index, buffer
+        return
+
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+    for index, item in enumerate(items):
+        yield index, item
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(loc) for loc in err['loc']) or 'row'}: {err['msg']}" for err in error.errors())
+
+async def iter_validated_chunks(
+    request: Request,
+    schema: Type[BaseModel],
+    errors: List[dict],
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> AsyncIterator[List[Tuple[int, BaseModel]]]:
+    chunk = []
+    async for index, raw in iter_json_items(request):
+        try:
+            item = schema.model_validate_json(raw) if isinstance(raw, bytes) else schema.model_validate(raw)
+        except ValidationError as e:
+            errors.append({"index": index, "detail": format_validation_error(e)})
+            continue
+        chunk.append((index, item))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,36 @@
+import re
+from typing import List, Optional
+
+# catalog genres are single categories ("Body, Mind & Spirit" has a comma), so only split on list separators
+GENRE_SEPARATORS = re.compile(r"[;|]")
+
+GENRE_ALIASES = {
+    "sci-fi": "science fiction",
+    "scifi": "science fiction",
+    "sf": "science fiction",
+    "fantasy fiction": "fantasy",
+    "detective and mystery stories": "mystery",
+    "mystery and detective stories": "mystery",
+    "children's stories": "juvenile fiction",
+    "ya": "young adult fiction",
+    "young adult": "young adult fiction",
+    "biography": "biography & autobiography",
+    "autobiography": "biography & autobiography",
+    "comics": "comics & graphic novels",
+    "graphic novels": "comics & graphic novels",
+}
+
+# placeholders that mean "no genre" rather than a genre called "unknown"
+IGNORED_GENRES = {"unknown", "n/a", "none"}
+
+def normalize_genre(genre: str) -> Optional[str]:
+    name = " ".join(genre.lower().split())
+    if not name or name in IGNORED_GENRES:
+        return None
+    return GENRE_ALIASES.get(name, name)
+
+def parse_genres(raw_genre: Optional[str]) -> List[str]:
+    if not raw_genre:
+        return []
+    genres = (normalize_genre(part) for part in GENRE_SEPARATORS.split(raw_genre))
+    return list(dict.fromkeys(genre for genre in genres if genre))
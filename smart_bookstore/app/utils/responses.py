@@ -0,0 +1,7 @@
+from typing import Iterable
+from fastapi.responses import ORJSONResponse
+
+def rows_response(rows: Iterable) -> ORJSONResponse:
+    # rows come straight from column selects and already match the response schema,
+    # so returning a Response here skips FastAPI's response_model re-validation
+    return ORJSONResponse([row._asdict() for row in rows])
@@ -0,0 +1,54 @@
+# Measures time to first byte, time to first streamed token and total time of the /chat SSE response.
+# Run from smart_bookstore/ against a running server, once per mode, and compare the two reports:
+#   SPECULATIVE_RETRIEVAL=false poetry run uvicorn app.app:app  ->  LABEL=sequential python -m benchmarks.bench_chat_ttfb
+#   SPECULATIVE_RETRIEVAL=true poetry run uvicorn app.app:app   ->  LABEL=speculative python -m benchmarks.bench_chat_ttfb
+import os
+import statistics
+import time
+import httpx
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
+LABEL = os.getenv("LABEL", "current")
+REQUESTS_PER_QUERY = int(os.getenv("REQUESTS_PER_QUERY", "10"))
+# sequential requests with pauses, so the per-user concurrency limit is never hit
+PAUSE_SECONDS = 0.2
+
+queries = {
+    "book_recommendation": "Can you recommend a book about grief and redemption in a small town?",
+    "top_books_genre": "top 5 books in fiction",
+    "greet": "Hello there!",
+    "unknown": "asdf qwerty",
+}
+
+def measure(client: httpx.Client, query: str):
+    start = time.perf_counter()
+    first_byte = first_token = None
+    with client.stream("GET", "/chat", params={"query": query}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            now = time.perf_counter()
+            if first_byte is None:
+                first_byte = now
+            if first_token is None and line.startswith("data: ") and line != "data: end":
+                first_token = now
+    end = time.perf_counter()
+    return ((first_byte or end) - start) * 1000, ((first_token or end) - start) * 1000, (end - start) * 1000
+
+def main():
+    print(f"mode: {LABEL}")
+    print(f"{'intent':<22} {'TTFB p50':>9} {'TTFB p90':>9} {'token p50':>10} {'token p90':>10} {'total p50':>10}")
+    with httpx.Client(base_url=BASE_URL, timeout=60) as client:
+        for intent, query in queries.items():
+            samples = []
+            for _ in range(REQUESTS_PER_QUERY):
+                samples.append(measure(client, query))
+                time.sleep(PAUSE_SECONDS)
+            ttfb, token, total = (sorted(column) for column in zip(*samples))
+            p90 = lambda values: values[max(0, int(len(values) * 0.9) - 1)]
+            print(
+                f"{intent:<22} {statistics.median(ttfb):>9.1f} {p90(ttfb):>9.1f} "
+                f"{statistics.median(token):>10.1f} {p90(token):>10.1f} {statistics.median(total):>10.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# Measures bytes-on-wire and latency percentiles for catalog list pages against a running server.
+# Run from smart_bookstore/: BASE_URL=http://localhost:8000 python -m benchmarks.bench_payload
+import os
+import statistics
+import time
+import httpx
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
+REQUESTS_PER_CASE = int(os.getenv("REQUESTS_PER_CASE", "200"))
+LIST_FIELDS = "book_id,title,author_id,genre,average_rating,published_year,cover"
+
+endpoints = [
+    "/books?page_size=50",
+    "/books/sorted_by_rating/desc?page_size=50",
+    "/books/publish_year/desc?page_size=50",
+]
+encodings = ["identity", "gzip", "br"]
+
+def percentile(samples, pct):
+    return statistics.quantiles(samples, n=100)[pct - 1] if len(samples) > 1 else samples[0]
+
+def measure(client: httpx.Client, url: str, encoding: str):
+    latencies, wire_bytes = [], 0
+    for _ in range(REQUESTS_PER_CASE):
+        start = time.perf_counter()
+        response = client.get(url, headers={"Accept-Encoding": encoding})
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        wire_bytes = response.num_bytes_downloaded
+    return wire_bytes, percentile(latencies, 50), percentile(latencies, 99)
+
+def main():
+    print(f"{'endpoint':<58} {'encoding':<9} {'bytes':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    with httpx.Client(base_url=BASE_URL) as client:
+        for endpoint in endpoints:
+            separator = "&" if "?" in endpoint else "?"
+            for url in (endpoint, f"{endpoint}{separator}fields={LIST_FIELDS}"):
+                for encoding in encodings:
+                    wire_bytes, p50, p99 = measure(client, url, encoding)
+                    label = url if len(url) <= 58 else url[:55] + "..."
+                    print(f"{label:<58} {encoding:<9} {wire_bytes:>9} {p50:>8.2f} {p99:>8.2f}")
+
+if __name__ == "__main__":
+    main()
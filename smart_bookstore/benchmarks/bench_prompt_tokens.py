@@ -0,0 +1,83 @@
+# Compares the recommendation prompt before and after context compression and the instructions-first layout.
+# Reports input tokens for each prompt and, when OPENAI_API_KEY is set, model latency and the usage reported by the API.
+# Run from smart_bookstore/: python -m benchmarks.bench_prompt_tokens
+import asyncio
+import os
+import statistics
+import time
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import HumanMessage
+from app.common.AI.context import compress_context, count_tokens
+from app.common.AI.retrieval_client import search_batch
+from app.utils.prompts import main_instructions, main_template
+
+# the template as it was, with the variable question and context ahead of the static instructions
+LEGACY_MAIN_TEMPLATE = '''
+QUESTION & CONTEXT:
+({question})
+
+INSTRUCTIONS:
+You're a smart library chatbot that answers human questions.
+You can converse with the human but make sure that if the human asks question you Answer the users QUESTION using the CONTEXT text above.
+Keep your answer ground in the facts of the CONTEXT.
+Don't mention the CONTEXT to the user.
+If the user asks about the chat history ANSWER IT.
+If the user's intent could not be recognized return (Sorry, I cant answer this question.)
+If the QUESTION doesnt relate to the CONTEXT return (Sorry, I cant answer this question as it doesnt relate to a book in my database.)'''
+
+queries = [
+    "Can you recommend a book about grief and redemption in a small town?",
+    "I want a detective story set in an English country house",
+    "Any books about the history of the Roman empire?",
+    "Recommend a science fiction novel about first contact with aliens",
+    "A book about learning to cook Italian food",
+]
+
+legacy_prompt = ChatPromptTemplate.from_template(LEGACY_MAIN_TEMPLATE)
+compact_prompt = ChatPromptTemplate.from_messages([("system", main_instructions), ("human", main_template)])
+
+def legacy_messages(query: str, context: list):
+    # chatbot.py used to pass a list of messages into the single-variable template, which rendered its repr
+    return legacy_prompt.format_messages(question=[HumanMessage(content=f"Context: {context}\n\nHuman Message: {query}")])
+
+def compact_messages(query: str, context: list):
+    return compact_prompt.format_messages(question=f"Context:\n{compress_context(context)}\n\nHuman Message: {query}")
+
+def prompt_tokens(messages) -> int:
+    return sum(count_tokens(message.content) for message in messages)
+
+async def timed_call(model, messages):
+    start = time.perf_counter()
+    response = await model.ainvoke(messages)
+    usage = response.usage_metadata or {}
+    cached = response.response_metadata.get("token_usage", {}).get("prompt_tokens_details", {}) or {}
+    return (time.perf_counter() - start) * 1000, usage.get("input_tokens"), cached.get("cached_tokens")
+
+async def measure_latency(cases):
+    from langchain_openai import ChatOpenAI
+    model = ChatOpenAI(model="gpt-4o-mini", api_key=os.environ["OPENAI_API_KEY"])
+    print(f"\n{'layout':<8} {'latency p50 ms':>15} {'input tokens':>13} {'cached tokens':>14}")
+    for label, build in (("legacy", legacy_messages), ("compact", compact_messages)):
+        results = [await timed_call(model, build(query, context)) for query, context in cases]
+        latencies = [latency for latency, _, _ in results]
+        input_tokens = sum(tokens or 0 for _, tokens, _ in results)
+        cached_tokens = sum(tokens or 0 for _, _, tokens in results)
+        print(f"{label:<8} {statistics.median(latencies):>15.0f} {input_tokens:>13} {cached_tokens:>14}")
+
+def main():
+    cases = [(query, [content for content, _, _ in results]) for query, results in zip(queries, search_batch(queries))]
+    print(f"{'query':<50} {'legacy':>8} {'compact':>8} {'saved':>7}")
+    totals = [0, 0]
+    for query, context in cases:
+        legacy, compact = prompt_tokens(legacy_messages(query, context)), prompt_tokens(compact_messages(query, context))
+        totals[0] += legacy
+        totals[1] += compact
+        print(f"{query[:50]:<50} {legacy:>8} {compact:>8} {1 - compact / legacy:>7.0%}")
+    print(f"{'total':<50} {totals[0]:>8} {totals[1]:>8} {1 - totals[1] / totals[0]:>7.0%}")
+    print(f"static prefix: {count_tokens(main_instructions)} tokens (provider caching needs a long enough prefix, e.g. 1024 tokens on OpenAI)")
+
+    if os.getenv("OPENAI_API_KEY"):
+        asyncio.run(measure_latency(cases))
+
+if __name__ == "__main__":
+    main()
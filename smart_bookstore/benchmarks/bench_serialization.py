@@ -0,0 +1,64 @@
+# Compares the old ORM + double pydantic validation path with column tuples + orjson.
+# Run from smart_bookstore/: python -m benchmarks.bench_serialization
+import json
+import timeit
+from typing import List
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.common.database.database import Base
+from app.common.database.models import Author, Book, BOOK_COLUMNS
+from app.schemas.book import BookSchema
+
+PAGE_SIZES = (10, 100, 1000)
+DESCRIPTION = "A long multi-paragraph description of the book. " * 20
+REPEAT = 5
+
+engine = create_engine("sqlite://")
+Base.metadata.create_all(engine, tables=[Author.__table__, Book.__table__])
+Session = sessionmaker(bind=engine)
+response_adapter = TypeAdapter(List[BookSchema])
+
+def seed(db, count: int) -> None:
+    db.execute(insert(Author), [{"author_id": 1, "name": "Author", "biography": ""}])
+    db.execute(insert(Book), [
+        {
+            "book_id": i,
+            "title": f"Book {i}",
+            "author_id": 1,
+            "genre": "Fiction",
+            "description": DESCRIPTION,
+            "average_rating": 3.5,
+            "published_year": 2000,
+            "cover": f"https://covers.example/{i}.jpg"
+        }
+        for i in range(1, count + 1)
+    ])
+    db.commit()
+
+def orm_path(db, page_size: int) -> bytes:
+    books = db.query(Book).limit(page_size).all()
+    validated = [BookSchema.model_validate(book) for book in books]
+    return json.dumps(jsonable_encoder(response_adapter.validate_python(validated, from_attributes=True))).encode()
+
+def orjson_path(db, page_size: int) -> bytes:
+    rows = db.query(*BOOK_COLUMNS).limit(page_size).all()
+    return orjson.dumps([row._asdict() for row in rows])
+
+def main():
+    with Session() as db:
+        seed(db, max(PAGE_SIZES))
+        print(f"{'rows':>6} {'orm+pydantic req/s':>20} {'columns+orjson req/s':>22} {'speedup':>8}")
+        for page_size in PAGE_SIZES:
+            number = max(1, 2000 // page_size)
+            results = {}
+            for name, path in (("orm", orm_path), ("orjson", orjson_path)):
+                db.expunge_all()
+                best = min(timeit.repeat(lambda: path(db, page_size), number=number, repeat=REPEAT)) / number
+                results[name] = 1 / best
+            print(f"{page_size:>6} {results['orm']:>20.1f} {results['orjson']:>22.1f} {results['orjson'] / results['orm']:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Compares the chroma store with the memory-mapped int8/float16 IVF index over raw_documents.txt:
+# recall@k against exact float32 search, per-query latency, and resident memory of the searching process.
+# Run from smart_bookstore/: python -m benchmarks.bench_vector_index
+# The corpus is embedded once and cached in vector_index_bench/; chroma must already be populated in chroma_db/.
+import multiprocessing
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+import numpy as np
+from app.common.AI.mmap_index import build_index, embed_documents, load_documents, normalize
+
+BENCH_DIRECTORY = Path("./vector_index_bench")
+QUERY_COUNT = 200
+K = 10
+NPROBES = (4, 8, 16)
+SEED = 0
+
+def memory_kb() -> dict:
+    # anonymous memory is private to the process; file-backed pages of a read-only mapping are shared through the page cache
+    fields = {}
+    for line in Path("/proc/self/status").read_text().splitlines():
+        name, _, value = line.partition(":")
+        if name in ("VmRSS", "RssAnon", "RssFile"):
+            fields[name] = int(value.split()[0])
+    return fields
+
+def run_backend(backend: str, option, query_vectors: np.ndarray) -> dict:
+    # runs in a fresh spawned process, so the memory figures only cover this backend
+    before = memory_kb()
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+        from app.common.AI.vector_store import CHROMA_DIRECTORY
+        chroma = Chroma(persist_directory=CHROMA_DIRECTORY)
+        search = lambda vector: [doc.page_content for doc in chroma.similarity_search_by_vector(vector.tolist(), k=K)]
+    else:
+        from app.common.AI.mmap_index import MmapIndex
+        index = MmapIndex(str(BENCH_DIRECTORY / backend))
+        search = lambda vector: [index.document(row) for row, _ in index.search_rows(vector, K, option)]
+
+    # one warm-up pass, so the figures describe a hot page cache rather than the first read from disk
+    for vector in query_vectors:
+        search(vector)
+    results, latencies = [], []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        results.append(search(vector))
+        latencies.append(time.perf_counter() - start)
+    return {"results": results, "latencies": latencies, "before": before, "after": memory_kb()}
+
+def recall_at_k(results: List[List[str]], truth: np.ndarray, positions: dict) -> float:
+    hits = 0
+    for documents, expected in zip(results, truth):
+        found = {positions.get(document) for document in documents}
+        hits += len(found & set(expected.tolist()))
+    return hits / truth.size
+
+def corpus_vectors(documents: List[str]) -> np.ndarray:
+    cache = BENCH_DIRECTORY / "corpus.npy"
+    if cache.exists():
+        vectors = np.load(cache)
+        if len(vectors) == len(documents):
+            return vectors
+    BENCH_DIRECTORY.mkdir(parents=True, exist_ok=True)
+    vectors = embed_documents(documents)
+    np.save(cache, vectors)
+    return vectors
+
+def main():
+    documents = load_documents()
+    positions = {document: i for i, document in enumerate(documents)}
+    vectors = normalize(corpus_vectors(documents))
+
+    # queries are description fragments, so they resemble but never equal a stored document
+    rng = np.random.default_rng(SEED)
+    sampled = rng.choice(len(documents), QUERY_COUNT, replace=False)
+    queries = [documents[i].partition(", its description is ")[2][:300] or documents[i][:300] for i in sampled]
+    query_vectors = normalize(embed_documents(queries))
+    truth = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :K]
+
+    for dtype in ("int8", "float16"):
+        build_index(documents, vectors, str(BENCH_DIRECTORY / dtype), dtype)
+    index_sizes = {
+        dtype: sum(path.stat().st_size for path in (BENCH_DIRECTORY / dtype).iterdir()) // 1024
+        for dtype in ("int8", "float16")
+    }
+    chroma_size = sum(path.stat().st_size for path in Path("./chroma_db").rglob("*") if path.is_file()) // 1024
+
+    runs = [("chroma", None)] + [(dtype, nprobe) for dtype in ("int8", "float16") for nprobe in NPROBES]
+    print(f"{len(documents)} documents, {QUERY_COUNT} queries, recall@{K} against exact float32 search")
+    print(f"on disk: chroma {chroma_size} kB, int8 {index_sizes['int8']} kB, float16 {index_sizes['float16']} kB")
+    print(f"{'backend':<16} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'RSS kB':>9} {'anon kB':>9} {'file kB':>9}")
+    context = multiprocessing.get_context("spawn")
+    for backend, option in runs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            run = pool.submit(run_backend, backend, option, query_vectors).result()
+        latencies = sorted(run["latencies"])
+        label = backend if option is None else f"{backend} nprobe={option}"
+        print(
+            f"{label:<16} {recall_at_k(run['results'], truth, positions):>7.3f} "
+            f"{statistics.median(latencies) * 1000:>8.2f} {latencies[int(len(latencies) * 0.99) - 1] * 1000:>8.2f} "
+            + " ".join(f"{run['after'][field] - run['before'][field]:>9}" for field in ("VmRSS", "RssAnon", "RssFile"))
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# Size of the seeded bench catalog and the accounts in it, shared by conftest.py and the benchmarks.
+import os
+
+BENCH_SCALE = float(os.getenv("BENCH_SCALE", "1"))
+AUTHORS = int(10_000 * BENCH_SCALE)
+BOOKS = int(100_000 * BENCH_SCALE)
+ACTIVITIES = int(1_000_000 * BENCH_SCALE)
+USERS = max(10, int(1_000 * BENCH_SCALE))
+LIKES = int(50_000 * BENCH_SCALE)
+ACTIVITY_DAYS = 60
+
+BENCH_PASSWORD = "bench-password"
+ADMIN_USERNAME = "bench_admin"
+USER_USERNAME = "bench_user_1"
@@ -0,0 +1,35 @@
+# Reports memory per gunicorn worker from /proc/<pid>/smaps_rollup (Linux only).
+# Run from smart_bookstore/ while the server is up: python -m benchmarks.measure_worker_memory <master pid>
+# Pss splits shared pages between the processes mapping them, so summing Pss gives the real total footprint.
+import sys
+from pathlib import Path
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+def child_pids(pid: int) -> list:
+    children = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        children += [int(child) for child in (task / "children").read_text().split()]
+    return children
+
+def smaps_rollup(pid: int) -> dict:
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":", 1)
+        if name in FIELDS:
+            values[name] = int(value.split()[0]) // 1024
+    return values
+
+def main(master_pid: int) -> None:
+    processes = [("master", master_pid)] + [("worker", pid) for pid in child_pids(master_pid)]
+    print(f"{'process':<8} {'pid':>8} " + " ".join(f"{field + ' MB':>17}" for field in FIELDS))
+    totals = dict.fromkeys(FIELDS, 0)
+    for role, pid in processes:
+        values = smaps_rollup(pid)
+        for field in FIELDS:
+            totals[field] += values.get(field, 0)
+        print(f"{role:<8} {pid:>8} " + " ".join(f"{values.get(field, 0):>17}" for field in FIELDS))
+    print(f"{'total':<8} {'':>8} " + " ".join(f"{totals[field]:>17}" for field in FIELDS))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]))
@@ -0,0 +1,51 @@
+import json
+from sqlalchemy import text
+from benchmarks.catalog import AUTHORS
+
+AUTHOR = {"name": "Benchmark Author", "biography": "Written by the benchmark suite."}
+
+def test_get_authors(benchmark, client, user_headers, check_threshold):
+    response = benchmark(client.get, "/authors?page=20&page_size=50", headers=user_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_authors_by_name(benchmark, client, user_headers, check_threshold):
+    response = benchmark(client.get, "/authors?name=Author 42&page_size=20", headers=user_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_author_by_id(benchmark, client, check_threshold):
+    response = benchmark(client.get, f"/authors/{AUTHORS // 2}")
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_create_author(benchmark, client, admin_headers, check_threshold):
+    response = benchmark(client.post, "/authors", json=AUTHOR, headers=admin_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_create_authors_bulk(benchmark, client, admin_headers, check_threshold):
+    body = json.dumps([{**AUTHOR, "name": f"Bulk Author {i}"} for i in range(1000)])
+    headers = {**admin_headers, "Content-Type": "application/json"}
+    response = benchmark.pedantic(client.post, args=("/authors/bulk",), kwargs={"content": body, "headers": headers}, rounds=5)
+    assert response.status_code == 200 and response.json()["inserted"] == 1000
+    check_threshold(benchmark)
+
+def test_update_author(benchmark, client, admin_headers, check_threshold):
+    response = benchmark(client.put, f"/authors/{AUTHORS // 3}", json=AUTHOR, headers=admin_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_delete_author(benchmark, client, db, admin_headers, check_threshold):
+    def setup():
+        author_id = db.execute(text("INSERT INTO authors (name) VALUES ('Scratch Author') RETURNING author_id")).scalar()
+        db.execute(text(
+            "INSERT INTO books (title, author_id, genre, average_rating, like_count) "
+            "SELECT 'Scratch ' || i, :author_id, 'Fiction', 3.0, 0 FROM generate_series(1, 10) i"
+        ), {"author_id": author_id})
+        db.commit()
+        return (f"/authors/{author_id}",), {"headers": admin_headers}
+
+    response = benchmark.pedantic(client.delete, setup=setup, rounds=20)
+    assert response.status_code == 200
+    check_threshold(benchmark)
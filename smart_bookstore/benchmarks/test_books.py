@@ -0,0 +1,131 @@
+import json
+from sqlalchemy import text
+from benchmarks.catalog import BOOKS
+
+BOOK = {
+    "title": "Benchmark Book",
+    "author_id": 1,
+    "genre": "Fiction",
+    "description": "Written by the benchmark suite.",
+    "average_rating": 4.2,
+    "published_year": 2024,
+    "cover": None
+}
+
+def create_scratch_book(db) -> int:
+    book_id = db.execute(text(
+        "INSERT INTO books (title, author_id, genre, average_rating, like_count) "
+        "VALUES ('Scratch', 1, 'Fiction', 3.0, 0) RETURNING book_id"
+    )).scalar()
+    db.commit()
+    return book_id
+
+def test_get_books(benchmark, client, check_threshold):
+    response = benchmark(client.get, "/books?page=50&page_size=50")
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_books_projected(benchmark, client, check_threshold):
+    response = benchmark(client.get, "/books?page=50&page_size=50&fields=title,author_id,average_rating")
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_book_by_id(benchmark, client, user_headers, check_threshold):
+    response = benchmark(client.get, f"/books/{BOOKS // 2}", headers=user_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_book_by_title(benchmark, client, check_threshold):
+    response = benchmark(client.get, "/books/title/Book 4242?page_size=20")
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_books_sorted_by_rating(benchmark, client, check_threshold):
+    response = benchmark(client.get, "/books/sorted_by_rating/desc?page=10&page_size=50")
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_books_by_publish_year(benchmark, client, check_threshold):
+    response = benchmark(client.get, "/books/publish_year/asc?page=10&page_size=50")
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_most_liked_books(benchmark, client, check_threshold):
+    response = benchmark(client.get, "/books/most_liked?limit=50")
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_top_books_by_genre(benchmark, client, check_threshold):
+    response = benchmark(client.get, "/books/top/genre/fiction?k=20")
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_top_books_by_author(benchmark, client, check_threshold):
+    response = benchmark(client.get, "/books/top/author/7?k=10")
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_recommendations(benchmark, client, user_headers, check_threshold):
+    response = benchmark(client.get, "/recommendations?page_size=20", headers=user_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_liked_books(benchmark, client, user_headers, check_threshold):
+    response = benchmark(client.get, "/books/likedbooks/?page_size=20", headers=user_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_like_statuses(benchmark, client, user_headers, check_threshold):
+    response = benchmark(client.post, "/books/likes/status", json=list(range(1, 51)), headers=user_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_like_and_unlike_book(benchmark, client, user_headers, check_threshold):
+    def like_and_unlike():
+        liked = client.post(f"/books/like/{BOOKS - 1}", headers=user_headers)
+        unliked = client.delete(f"/books/unlike/{BOOKS - 1}", headers=user_headers)
+        return liked, unliked
+
+    liked, unliked = benchmark(like_and_unlike)
+    assert liked.status_code == 200 and unliked.status_code == 200
+    check_threshold(benchmark)
+
+def test_create_book(benchmark, client, admin_headers, check_threshold):
+    response = benchmark(client.post, "/books", json=BOOK, headers=admin_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_create_books_bulk(benchmark, client, admin_headers, check_threshold):
+    body = "\n".join(json.dumps({**BOOK, "title": f"Bulk {i}", "author_id": 1 + i % 100}) for i in range(1000))
+    headers = {**admin_headers, "Content-Type": "application/x-ndjson"}
+    response = benchmark.pedantic(client.post, args=("/books/bulk",), kwargs={"content": body, "headers": headers}, rounds=5)
+    assert response.status_code == 200 and response.json()["inserted"] == 1000
+    check_threshold(benchmark)
+
+def test_update_book(benchmark, client, admin_headers, check_threshold):
+    response = benchmark(client.put, f"/books/{BOOKS // 3}", json={**BOOK, "genre": "History"}, headers=admin_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_delete_book(benchmark, client, db, admin_headers, check_threshold):
+    def setup():
+        return (f"/books/{create_scratch_book(db)}",), {"headers": admin_headers}
+
+    response = benchmark.pedantic(client.delete, setup=setup, rounds=20)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_export_books(benchmark, client, admin_headers, check_threshold):
+    response = benchmark.pedantic(client.get, args=("/admin/books/export?format=ndjson&compress=true",), kwargs={"headers": admin_headers}, rounds=1)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_refresh_rankings(benchmark, client, admin_headers, check_threshold):
+    response = benchmark.pedantic(client.post, args=("/admin/rankings/refresh",), kwargs={"headers": admin_headers}, rounds=3)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_reconcile_like_counts(benchmark, client, admin_headers, check_threshold):
+    response = benchmark.pedantic(client.post, args=("/admin/books/like_counts/reconcile",), kwargs={"headers": admin_headers}, rounds=3)
+    assert response.status_code == 200
+    check_threshold(benchmark)
@@ -0,0 +1,73 @@
+from itertools import count
+from sqlalchemy import text
+from benchmarks.catalog import BENCH_PASSWORD, USER_USERNAME
+
+HEAVY_USER_ACTIVITIES = 100_000
+
+def test_register_user(benchmark, client, check_threshold):
+    usernames = count()
+    response = benchmark(lambda: client.post("/users/register", json={"username": f"registered_{next(usernames)}", "password": BENCH_PASSWORD}))
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_login_user(benchmark, client, check_threshold):
+    response = benchmark(client.post, "/users/login", data={"username": USER_USERNAME, "password": BENCH_PASSWORD})
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_read_users_me(benchmark, client, user_headers, check_threshold):
+    response = benchmark(client.get, "/users/me", headers=user_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_user_activities(benchmark, client, admin_headers, check_threshold):
+    response = benchmark(client.get, f"/admin/activities?username={USER_USERNAME}&page_size=50", headers=admin_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_read_users(benchmark, client, admin_headers, check_threshold):
+    response = benchmark(client.get, "/admin/users?page=5&page_size=50", headers=admin_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_get_user_preferences(benchmark, client, user_headers, check_threshold):
+    response = benchmark(client.get, "/users/preferences", headers=user_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_update_user_genres(benchmark, client, user_headers, check_threshold):
+    selections = [["Fiction", "History"], ["Science", "Poetry", "Drama"]]
+    rounds = count()
+    response = benchmark(lambda: client.post("/users/preferences/genres", json=selections[next(rounds) % 2], headers=user_headers))
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_update_user_preferences(benchmark, client, user_headers, check_threshold):
+    response = benchmark(client.put, "/users/preferences/language", json=["en", "fr", "de"], headers=user_headers)
+    assert response.status_code == 200
+    check_threshold(benchmark)
+
+def test_delete_heavy_user(benchmark, client, db, admin_headers, check_threshold):
+    usernames = count()
+
+    def setup():
+        username = f"heavy_user_{next(usernames)}"
+        db.execute(text("INSERT INTO users (username, password_hash, role) VALUES (:username, '', 'user')"), {"username": username})
+        db.execute(text(
+            "INSERT INTO user_activities (username, event_type, target_id, timestamp) "
+            "SELECT :username, 'book_view'::activity_type, 1 + i % 1000, now() - (i % 50) * interval '1 day' "
+            "FROM generate_series(1, :activities) i"
+        ), {"username": username, "activities": HEAVY_USER_ACTIVITIES})
+        db.execute(text(
+            "INSERT INTO user_liked_books (username, book_id) SELECT :username, i FROM generate_series(1, 100) i"
+        ), {"username": username})
+        db.execute(text("UPDATE books SET like_count = like_count + 1 WHERE book_id <= 100"))
+        db.commit()
+        return (f"/admin/users/{username}",), {"headers": admin_headers}
+
+    response = benchmark.pedantic(client.delete, setup=setup, rounds=3)
+    assert response.status_code == 200
+
+    remaining = db.execute(text("SELECT count(*) FROM user_activities WHERE username LIKE 'heavy_user_%'")).scalar()
+    assert remaining == 0
+    check_threshold(benchmark)
@@ -0,0 +1,29 @@
+# Production run mode: poetry run gunicorn app.app:app -c gunicorn.conf.py
+import gc
+import multiprocessing
+import os
+
+# tokenizers warns (and can deadlock) when its thread pool is inherited across fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+# in-memory chat sessions are per worker, so a conversation would lose its history when the next message hits another one
+os.environ.setdefault("CHAT_HISTORY_BACKEND", "sql")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# import the app (and with it the embedding model) once in the master, so workers share those pages copy-on-write;
+# PRELOAD_APP=false makes every worker import it on its own, for comparing memory
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+
+def pre_fork(server, worker):
+    # keeps the collector from touching preloaded objects in the children, which would dirty the shared pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    # pooled connections opened by the master during import must not be reused by the children
+    from app.common.database.database import engine
+    engine.dispose(close=False)
@@ -0,0 +1,18 @@
+from datetime import date
+from sqlalchemy import text
+from app.common.CRUD.activity_crud import DEFAULT_PARTITION, add_months, ensure_activity_partitions, partition_name
+
+def test_missing_partition_is_created_over_default_rows(db):
+    month = add_months(date.today().replace(day=1), 1)
+    db.execute(text(f"DROP TABLE {partition_name(month)}"))
+    db.execute(text("INSERT INTO users (username, password_hash, role) VALUES ('reader', '', 'user')"))
+    db.execute(text(
+        "INSERT INTO user_activities (username, event_type, target_id, timestamp) "
+        "VALUES ('reader', 'book_view'::activity_type, 1, :timestamp)"
+    ), {"timestamp": month.replace(day=15)})
+    db.commit()
+
+    ensure_activity_partitions(db)
+
+    assert db.execute(text("SELECT tableoid::regclass::text FROM user_activities")).scalars().all() == [partition_name(month)]
+    assert db.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar() == 0
@@ -0,0 +1,23 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from app.common.CRUD.book_crud import get_most_liked_books
+
+@pytest.fixture
+def liked_books(db):
+    db.execute(text("INSERT INTO authors (author_id, name) VALUES (1, 'Author')"))
+    db.execute(text("INSERT INTO books (book_id, title, author_id, like_count) SELECT i, 'Book ' || i, 1, i % 3 FROM generate_series(1, 9) i"))
+    db.commit()
+
+def test_most_liked_cursor_walks_every_book_once(db, liked_books):
+    seen, cursor = [], {}
+    while page := get_most_liked_books(db, 4, **cursor):
+        seen += [(book.like_count, book.book_id) for book in page]
+        cursor = {"after_count": page[-1].like_count, "after_id": page[-1].book_id}
+    assert seen == sorted(((i % 3, i) for i in range(1, 10)), reverse=True)
+
+@pytest.mark.parametrize("cursor", [{"after_count": 1}, {"after_id": 5}])
+def test_most_liked_rejects_half_cursor(db, liked_books, cursor):
+    with pytest.raises(HTTPException) as error:
+        get_most_liked_books(db, 4, **cursor)
+    assert error.value.status_code == 400
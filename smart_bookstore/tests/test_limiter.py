@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.middleware.limiter import ConcurrencyLimiter
+
+def test_rejected_clients_leave_no_entries():
+    async def run():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_per_user=1, max_queue=0, queue_timeout=1, retry_after=1)
+        await limiter.acquire("holder")
+        # the queue is full, so every other client is shed without ever holding a slot
+        for client in range(100):
+            with pytest.raises(HTTPException) as error:
+                await limiter.acquire(f"ip:{client}")
+            assert error.value.status_code == 503
+        assert not await limiter.try_reserve()
+        limiter.release("holder")
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter._per_user == {}
+
+def test_reserved_slot_is_claimed_under_the_user_cap():
+    async def run():
+        limiter = ConcurrencyLimiter(max_concurrent=4, max_per_user=1, max_queue=4, queue_timeout=1, retry_after=1)
+        await limiter.acquire("user")
+        assert await limiter.try_reserve()
+        with pytest.raises(HTTPException) as error:
+            limiter.claim("user")
+        assert error.value.status_code == 429
+        limiter.unreserve()
+        limiter.release("user")
+        assert await limiter.try_reserve()
+        limiter.claim("user")
+        limiter.release("user")
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter._per_user == {}
+    assert limiter._semaphore._value == 4
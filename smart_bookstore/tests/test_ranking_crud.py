@@ -0,0 +1,56 @@
+import threading
+from sqlalchemy import text
+from app.common.database.database import SessionLocal
+from app.common.CRUD.ranking_crud import AUTHOR_SCOPE, GENRE_SCOPE, get_top_books, refresh_all_rankings, refresh_book_rankings, refresh_ranking
+
+BOOKS = 20
+
+def seed_catalog(db) -> None:
+    db.execute(text("INSERT INTO authors (author_id, name) VALUES (1, 'Author')"))
+    db.execute(text("INSERT INTO genres (genre_id, name) VALUES (1, 'fiction')"))
+    db.execute(text(
+        "INSERT INTO books (book_id, title, author_id, genre, average_rating, like_count) "
+        "SELECT i, 'Book ' || i, 1, 'Fiction', i / 10.0, 0 FROM generate_series(1, :books) i"
+    ), {"books": BOOKS})
+    db.execute(text("INSERT INTO book_genres (book_id, genre_id) SELECT i, 1 FROM generate_series(1, :books) i"), {"books": BOOKS})
+    db.commit()
+
+def refresh_in_thread(refresh, errors: list) -> threading.Thread:
+    def run():
+        with SessionLocal() as session:
+            try:
+                refresh(session)
+            except Exception as error:
+                errors.append(error)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+def test_overlapping_key_refreshes_wait_for_each_other(db):
+    seed_catalog(db)
+    # the first refresh has rewritten the key but not committed yet when the second one starts
+    refresh_ranking(db, GENRE_SCOPE, "fiction")
+    errors = []
+    thread = refresh_in_thread(lambda session: refresh_book_rankings(session, ["Fiction"], [1]), errors)
+    thread.join(timeout=1)
+    assert thread.is_alive()
+    db.commit()
+    thread.join(timeout=10)
+
+    assert not errors
+    top = get_top_books(db, GENRE_SCOPE, "fiction", BOOKS)
+    assert [book.book_id for book in top] == list(range(BOOKS, 0, -1))
+
+def test_full_refresh_waits_for_key_refresh(db):
+    seed_catalog(db)
+    refresh_ranking(db, AUTHOR_SCOPE, "1")
+    errors = []
+    thread = refresh_in_thread(refresh_all_rankings, errors)
+    thread.join(timeout=1)
+    assert thread.is_alive()
+    db.commit()
+    thread.join(timeout=10)
+
+    assert not errors
+    assert len(get_top_books(db, AUTHOR_SCOPE, "1", BOOKS)) == BOOKS
+    assert len(get_top_books(db, GENRE_SCOPE, "fiction", BOOKS)) == BOOKS
@@ -0,0 +1,58 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from app.common.CRUD.user_crud import delete_user
+
+HEAVY_USER_ACTIVITIES = 100_000
+LIKED_BOOKS = 50
+OTHER_LIKES = 3
+
+def count_rows(db, table: str, username: str) -> int:
+    return db.execute(text(f"SELECT count(*) FROM {table} WHERE username = :username"), {"username": username}).scalar()
+
+def test_delete_user_cascades(db):
+    username, other = "heavy_user", "other_user"
+    db.execute(text("INSERT INTO authors (author_id, name) VALUES (1, 'Author')"))
+    db.execute(text(
+        "INSERT INTO books (book_id, title, author_id, like_count) SELECT i, 'Book ' || i, 1, 0 FROM generate_series(1, :books) i"
+    ), {"books": LIKED_BOOKS})
+    db.execute(text("INSERT INTO users (username, password_hash, role) VALUES (:username, '', 'user'), (:other, '', 'user')"),
+               {"username": username, "other": other})
+    db.execute(text(
+        "INSERT INTO user_activities (username, event_type, target_id, timestamp) "
+        "SELECT :username, 'book_view'::activity_type, 1 + i % :books, now() - (i % 60) * interval '1 day' "
+        "FROM generate_series(1, :activities) i"
+    ), {"username": username, "books": LIKED_BOOKS, "activities": HEAVY_USER_ACTIVITIES})
+    db.execute(text(
+        "INSERT INTO userpreferences (username, preference_type, preference_value) "
+        "VALUES (:username, 'genre', 'Fiction'), (:username, 'language', 'en')"
+    ), {"username": username})
+    db.execute(text("INSERT INTO user_liked_books (username, book_id) SELECT :username, i FROM generate_series(1, :books) i"),
+               {"username": username, "books": LIKED_BOOKS})
+    db.execute(text("INSERT INTO user_liked_books (username, book_id) SELECT :other, i FROM generate_series(1, :likes) i"),
+               {"other": other, "likes": OTHER_LIKES})
+    db.execute(text(
+        "UPDATE books SET like_count = (SELECT count(*) FROM user_liked_books WHERE user_liked_books.book_id = books.book_id)"
+    ))
+    db.execute(text(
+        "INSERT INTO user_recommendations (username, rank, book_id, score, generated_at) "
+        "SELECT :username, i, i, 1.0 / i, now() FROM generate_series(1, 10) i"
+    ), {"username": username})
+    db.execute(text("INSERT INTO user_feeds (username, size, generated_at) VALUES (:username, 10, now())"), {"username": username})
+    db.commit()
+    assert count_rows(db, "user_activities", username) == HEAVY_USER_ACTIVITIES
+
+    delete_user(db, username)
+
+    assert count_rows(db, "users", username) == 0
+    for table in ("user_activities", "userpreferences", "user_liked_books", "user_recommendations", "user_feeds"):
+        assert count_rows(db, table, username) == 0, table
+    like_counts = dict(db.execute(text("SELECT book_id, like_count FROM books")).all())
+    # only the other user's likes are left on the books both of them liked
+    assert like_counts == {book_id: int(book_id <= OTHER_LIKES) for book_id in range(1, LIKED_BOOKS + 1)}
+    assert count_rows(db, "user_liked_books", other) == OTHER_LIKES
+
+def test_delete_missing_user(db):
+    with pytest.raises(HTTPException) as error:
+        delete_user(db, "missing_user")
+    assert error.value.status_code == 404